@@ -0,0 +1,192 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from analysis_outputs import add_outputs, render_options, video_output
+from analysis_profile import RequestProfile, analysis_profiles
+from landmark_cache import landmark_cache
+from pose_pool import PosePool
+from video_analysis import analyze_video_cached, result_to_json
+
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+ANALYSIS_MAX_QUEUED = int(os.getenv("ANALYSIS_MAX_QUEUED", 8))
+ANALYSIS_JOB_TTL = float(os.getenv("ANALYSIS_JOB_TTL", 3600))
+JOBS_ROOT = os.getenv("ANALYSIS_JOBS_ROOT") or None
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+# Each worker process keeps its own single-estimator pose pool for its lifetime
+_worker_pose_pool = None
+
+
+def _init_worker():
+    global _worker_pose_pool
+    _worker_pose_pool = PosePool(size=1)
+
+
+def _write_progress(job_dir, processed, total):
+    tmp_path = os.path.join(job_dir, 'progress.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump({'frames_processed': processed, 'total_frames': total}, f)
+    os.replace(tmp_path, os.path.join(job_dir, 'progress.json'))
+
+
+def run_analysis_job(job_dir, input_video_path, options, outputs):
+    _write_progress(job_dir, 0, 0)
+    with open(os.path.join(job_dir, 'started'), 'w'):
+        pass
+
+    output_video_path = os.path.join(job_dir, 'analyzed_video.mp4') if video_output(outputs) else None
+    with RequestProfile() as profile:
+        def progress(processed, total):
+            _write_progress(job_dir, processed, total)
+            profile.sample_memory()
+
+        with profile.stage('analyze'):
+            result = analyze_video_cached(_worker_pose_pool, landmark_cache, input_video_path, output_video_path,
+                                          progress=progress, **options, **render_options(video_output(outputs)))
+        with profile.stage('outputs'):
+            add_outputs(result, outputs, input_video_path)
+        result['profile'] = profile.finish(result)
+    return result
+
+
+# Runs /analyze jobs on a process pool so pose estimation never ties up the Flask
+# request threads. At most max_workers jobs run at once and at most max_queued more
+# wait behind them; further submissions are rejected until the queue drains.
+class AnalysisJobManager:
+    def __init__(self, max_workers=ANALYSIS_WORKERS, max_queued=ANALYSIS_MAX_QUEUED, job_ttl=ANALYSIS_JOB_TTL):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.job_ttl = job_ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            # Spawned workers re-import the main script (server.py) as __mp_main__;
+            # its startup work stays under if __name__ == '__main__'
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_init_worker)
+        return self._executor
+
+    # outputs as returned by analysis_outputs.parse_outputs
+    def submit(self, upload_path, options, outputs=('video',)):
+        with self._lock:
+            self._prune()
+            active = sum(job['status'] in (QUEUED, RUNNING) for job in self._jobs.values())
+            if active >= self.max_workers + self.max_queued:
+                raise JobQueueFull(f'Analysis queue is full ({active} jobs pending)')
+
+            job_id = uuid.uuid4().hex
+            job_dir = tempfile.mkdtemp(prefix=f'job_{job_id}_', dir=JOBS_ROOT)
+            input_video_path = os.path.join(job_dir, 'uploaded_video' + os.path.splitext(upload_path)[1])
+            shutil.move(upload_path, input_video_path)
+
+            job = {
+                'id': job_id,
+                'dir': job_dir,
+                'status': QUEUED,
+                'outputs': tuple(outputs),
+                'created_at': time.time(),
+                'finished_at': None,
+                'result': None,
+                'error': None,
+            }
+            self._jobs[job_id] = job
+            future = self._get_executor().submit(run_analysis_job, job_dir, input_video_path, options, outputs)
+
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+        return job_id
+
+    def _finish(self, job_id, future):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            try:
+                job['result'] = future.result()
+                job['status'] = DONE
+                # Worker processes profile their own jobs; the histograms live here
+                analysis_profiles.record(job['result']['profile'])
+            except Exception as e:
+                job['error'] = str(e)
+                job['status'] = FAILED
+            job['finished_at'] = time.time()
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+
+            status = job['status']
+            if status == QUEUED and os.path.exists(os.path.join(job['dir'], 'started')):
+                status = job['status'] = RUNNING
+
+            progress = {'frames_processed': 0, 'total_frames': None}
+            try:
+                with open(os.path.join(job['dir'], 'progress.json')) as f:
+                    progress = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+            return {
+                'job_id': job_id,
+                'status': status,
+                'frames_processed': progress['frames_processed'],
+                'total_frames': progress['total_frames'] or None,
+                'outputs': list(job['outputs']),
+                'result': None if job['result'] is None else result_to_json(
+                    {key: value for key, value in job['result'].items() if key not in ('overlay', 'thumbnails')},
+                    include_landmarks=False),
+                'error': job['error'],
+            }
+
+    def result(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return None if job is None else job['result']
+
+    # Path of the annotated video, or None if the job isn't done or has JSON outputs
+    def result_path(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] != DONE or not video_output(job['outputs']):
+                return None
+            return os.path.join(job['dir'], 'analyzed_video.mp4')
+
+    def stats(self):
+        with self._lock:
+            counts = {state: 0 for state in (QUEUED, RUNNING, DONE, FAILED)}
+            for job in self._jobs.values():
+                counts[job['status']] += 1
+            return {'max_workers': self.max_workers, 'max_queued': self.max_queued, 'jobs': counts}
+
+    # Drops finished jobs (and their files) once they are older than the TTL
+    def _prune(self):
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job['finished_at'] is not None and now - job['finished_at'] > self.job_ttl:
+                shutil.rmtree(job['dir'], ignore_errors=True)
+                del self._jobs[job_id]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+
+
+analysis_jobs = AnalysisJobManager()
@@ -0,0 +1,150 @@
+import base64
+import os
+
+import cv2
+import numpy as np
+
+from landmarks import JOINT_INDEX, LandmarkSeries, knee_angles
+from squat_analyzer import SquatAnalyzer
+from video_analysis import LANDMARK_NAMES, draw_annotations
+
+# What /analyze sends back:
+#   video:      the annotated mp4 at the source resolution and frame rate
+#   compact:    the annotated mp4 downscaled to COMPACT_VIDEO_SIZE at COMPACT_VIDEO_FPS
+#   landmarks:  JSON verdict plus per-frame landmarks at 0.1 px
+#   overlay:    JSON verdict plus a vector overlay track the client draws over its
+#               own copy of the clip
+#   thumbnails: JSON verdict plus an annotated JPEG at each phase transition
+# The JSON parts combine, e.g. output=overlay,thumbnails.
+VIDEO_OUTPUTS = ('video', 'compact')
+JSON_OUTPUTS = ('landmarks', 'overlay', 'thumbnails')
+ANALYSIS_OUTPUTS = VIDEO_OUTPUTS + JSON_OUTPUTS
+
+# mp4v has no bitrate control in OpenCV, so the compact render saves its bytes on
+# resolution and frame rate
+COMPACT_VIDEO_SIZE = int(os.getenv("COMPACT_VIDEO_SIZE", 480))
+COMPACT_VIDEO_FPS = float(os.getenv("COMPACT_VIDEO_FPS", 15))
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", 320))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", 75))
+
+# Bones drawn by draw_skeleton, as pairs of indices into LANDMARK_NAMES
+SKELETON_EDGES = [[JOINT_INDEX[a], JOINT_INDEX[b]] for side in ('left', 'right')
+                  for a, b in ((f'{side}_shoulder', f'{side}_hip'), (f'{side}_hip', f'{side}_knee'),
+                               (f'{side}_knee', f'{side}_ankle'))]
+
+
+# The requested outputs as a tuple: a single video output, or one or more JSON parts
+def parse_outputs(output):
+    outputs = tuple(part.strip() for part in output.split(','))
+    if len(outputs) == 1 and outputs[0] in VIDEO_OUTPUTS:
+        return outputs
+    if not all(part in JSON_OUTPUTS for part in outputs) or len(set(outputs)) != len(outputs):
+        raise ValueError(f'output must be one of {list(VIDEO_OUTPUTS)}, or a comma-separated list of '
+                         f'{list(JSON_OUTPUTS)}')
+    return outputs
+
+
+def video_output(outputs):
+    return outputs[0] if outputs[0] in VIDEO_OUTPUTS else None
+
+
+# analyze_video keyword arguments for a video output
+def render_options(output):
+    if output == 'compact':
+        return {'render_size': COMPACT_VIDEO_SIZE, 'render_fps': COMPACT_VIDEO_FPS}
+    return {}
+
+
+def _hex_color(bgr):
+    return '#{:02x}{:02x}{:02x}'.format(bgr[2], bgr[1], bgr[0])
+
+
+# Replays the phase logic frame by frame, as the annotated video is drawn, and
+# returns the phase transitions and the (frame, color, feedback) changes of the
+# skeleton styling. The colors stay BGR, as OpenCV draws them.
+def replay_styles(series, analyzer_options=None):
+    analyzer = SquatAnalyzer(series.frame_rate, **{**(analyzer_options or {}), 'verbose': False})
+    points = np.trunc(series.points)
+    angles = knee_angles(LandmarkSeries(points, series.frame_rate))
+    phases = []
+    styles = []
+    for frame_index in np.flatnonzero(series.valid).tolist():
+        entered = analyzer.update(frame_index, points[frame_index], float(angles[frame_index]))
+        if not phases:
+            phases.append(('START', frame_index))
+        phases.extend((phase.name, frame_index) for phase in entered)
+        style = (analyzer.skeletal_color, analyzer.feedback)
+        if not styles or styles[-1][1:] != style:
+            styles.append((frame_index, *style))
+    return phases, styles
+
+
+# Everything the annotated video draws, as data: integer pixel joints per frame
+# (flattened x, y pairs in landmark_names order, null without a pose), the bones
+# between them, and the skeleton color and feedback text from each frame on. A
+# few kilobytes where the rendered mp4 is megabytes.
+def overlay_track(series, frame_size, styles):
+    points = np.trunc(series.points)
+    return {
+        'frame_rate': series.frame_rate,
+        'frame_size': list(frame_size),
+        'landmark_names': LANDMARK_NAMES,
+        'edges': SKELETON_EDGES,
+        'points': [points[i].astype(int).ravel().tolist() if valid else None
+                   for i, valid in enumerate(series.valid.tolist())],
+        'styles': [{'frame': frame, 'color': _hex_color(color), 'feedback': feedback}
+                   for frame, color, feedback in styles],
+    }
+
+
+# Annotated, downscaled JPEGs of the frames where the phases changed, base64 in the
+# JSON. Frames are decoded in order up to the last one needed; those in between
+# are only grabbed, not converted.
+def phase_thumbnails(input_video_path, series, phases, styles, size=THUMBNAIL_SIZE, quality=THUMBNAIL_QUALITY):
+    wanted = {}
+    for name, frame_index in phases:
+        wanted.setdefault(frame_index, []).append(name)
+    style_frames = [frame for frame, _, _ in styles]
+
+    thumbnails = []
+    cap = cv2.VideoCapture(input_video_path)
+    try:
+        for frame_index in range(max(wanted, default=-1) + 1):
+            if not cap.grab():
+                break
+            if frame_index not in wanted:
+                continue
+            ret, frame = cap.retrieve()
+            if not ret:
+                break
+
+            height, width = frame.shape[:2]
+            scale = min(1.0, size / max(height, width))
+            if scale < 1:
+                frame = cv2.resize(frame, (max(1, round(width * scale)), max(1, round(height * scale))),
+                                   interpolation=cv2.INTER_AREA)
+            if series.valid[frame_index]:
+                _, color, feedback = styles[np.searchsorted(style_frames, frame_index, side='right') - 1]
+                draw_annotations(frame, series.points[frame_index], color, feedback, scale)
+            _, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            thumbnails.append({'frame': frame_index, 'phases': wanted[frame_index],
+                               'width': frame.shape[1], 'height': frame.shape[0],
+                               'jpeg': base64.b64encode(jpeg.tobytes()).decode('ascii')})
+    finally:
+        cap.release()
+    return thumbnails
+
+
+# Adds the requested overlay and thumbnails parts to an analyze_video result; the
+# uploaded video is only read again for thumbnails
+def add_outputs(result, outputs, input_video_path, analyzer_options=None):
+    if 'overlay' not in outputs and 'thumbnails' not in outputs:
+        return result
+
+    series = LandmarkSeries(result['landmarks'], result['frame_rate'])
+    phases, styles = replay_styles(series, analyzer_options)
+    if 'overlay' in outputs:
+        result['overlay'] = overlay_track(series, result['frame_size'], styles)
+    if 'thumbnails' in outputs:
+        result['thumbnails'] = phase_thumbnails(input_video_path, series, phases, styles)
+    return result
@@ -0,0 +1,264 @@
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import numpy as np
+
+# Requests slower than this are counted as slow, logged, and (with the sampling
+# profiler on) have their stack samples written out
+ANALYSIS_PROFILE_SLOW_MS = float(os.getenv("ANALYSIS_PROFILE_SLOW_MS", 10000))
+# Opt-in sampling profiler: a thread that snapshots the request's stacks every
+# ANALYSIS_PROFILER_INTERVAL_MS. Off by default; it costs a few percent while on.
+ANALYSIS_PROFILER = os.getenv("ANALYSIS_PROFILER", "0") == "1"
+ANALYSIS_PROFILER_INTERVAL_MS = float(os.getenv("ANALYSIS_PROFILER_INTERVAL_MS", 5))
+ANALYSIS_PROFILE_DIR = os.getenv("ANALYSIS_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), 'powerlift_profiles')
+
+# Histogram bucket upper bounds; anything larger lands in the +Inf bucket
+DURATION_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+FRAME_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200)
+MEMORY_BUCKETS_MB = (128, 256, 512, 1024, 2048, 4096)
+
+# Per-frame pipeline stages reported from analyze_video's counters (see
+# video_pipeline.py); convert and pose are the two halves of infer
+PIPELINE_STAGES = ('decode', 'convert', 'pose', 'infer', 'render', 'encode')
+
+# Stack tops in these files are threads waiting, not working
+IDLE_FILES = ('(threading.py)', '(queue.py)')
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+# Resident set size of this process in MB, or None where /proc isn't available.
+# It is process-wide, so concurrent requests see each other's memory.
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)})'
+
+
+# Statistical profiler over the request's own thread and the pipeline threads it
+# started (video_pipeline.py names them '<stage>:<request thread name>'). Stacks are
+# kept in collapsed form, one 'thread;outer;...;inner count' line per distinct
+# stack, which flamegraph.pl and speedscope read directly.
+class SamplingProfiler:
+    def __init__(self, thread=None, interval_ms=ANALYSIS_PROFILER_INTERVAL_MS, on_sample=None):
+        thread = thread or threading.current_thread()
+        self.thread_name = thread.name
+        self.thread_id = thread.ident
+        self.interval = interval_ms / 1000
+        self.on_sample = on_sample
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='analysis-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if not self._stop.is_set():
+            self._stop.set()
+            self._thread.join()
+
+    def _threads(self):
+        suffix = f':{self.thread_name}'
+        return {thread.ident: ('request' if thread.ident == self.thread_id else thread.name[:-len(suffix)])
+                for thread in threading.enumerate()
+                if thread.ident == self.thread_id or thread.name.endswith(suffix)}
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            threads = self._threads()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id not in threads:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(threads[thread_id])
+                self.samples[';'.join(reversed(stack))] += 1
+            if self.on_sample is not None:
+                self.on_sample()
+
+    # Functions most often on top of the stack, as [label, share of samples], leaving
+    # out threads idling on a lock or a pipeline queue
+    def hot(self, n=5):
+        leaves = Counter()
+        for stack, count in self.samples.items():
+            leaf = stack.rsplit(';', 1)[-1]
+            if not leaf.endswith(IDLE_FILES):
+                leaves[leaf] += count
+        total = sum(leaves.values())
+        return [[label, round(count / total, 3)] for label, count in leaves.most_common(n)] if total else []
+
+    def write(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f'{stack} {count}\n')
+        return path
+
+
+# Timings, frame counts and memory for one /analyze request. Wrap each step in
+# stage(name); pass sample_memory as analyze_video's progress callback to track
+# memory while frames are processed; finish(result) returns the profile as a dict.
+class RequestProfile:
+    def __init__(self, profiler=ANALYSIS_PROFILER, slow_ms=ANALYSIS_PROFILE_SLOW_MS):
+        self.slow_ms = slow_ms
+        self.started = time.perf_counter()
+        self.stages_ms = {}
+        self.rss_start = self.rss_peak = rss_mb()
+        self.profiler = SamplingProfiler(on_sample=self.sample_memory).start() if profiler else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profiler is not None:
+            self.profiler.stop()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages_ms[name] = self.stages_ms.get(name, 0.0) + (time.perf_counter() - start) * 1000
+            self.sample_memory()
+
+    def sample_memory(self, *args):
+        rss = rss_mb()
+        if rss is not None and (self.rss_peak is None or rss > self.rss_peak):
+            self.rss_peak = rss
+
+    def finish(self, result=None):
+        total_ms = (time.perf_counter() - self.started) * 1000
+        self.sample_memory()
+        profile = {
+            'total_ms': round(total_ms, 1),
+            'stages_ms': {name: round(ms, 1) for name, ms in self.stages_ms.items()},
+            'pipeline_ms': {},
+            'frames': 0,
+            'pose_frames': 0,
+            'no_landmark_frames': 0,
+            'ms_per_frame': None,
+            'memory_mb': {'start': _round(self.rss_start), 'peak': _round(self.rss_peak), 'end': _round(rss_mb())},
+            'slow': total_ms > self.slow_ms,
+            'profiler': None,
+        }
+        if result is not None:
+            # The pipeline stages run concurrently when pipelined, so they needn't sum to analyze
+            stages = result.get('stages') or {}
+            profile['pipeline_ms'] = {name: round(stages[name]['busy_s'] * 1000, 1)
+                                      for name in PIPELINE_STAGES if name in stages}
+            profile['frames'] = result['frames']
+            profile['pose_frames'] = result['pose_frames']
+            profile['no_landmark_frames'] = int(np.isnan(result['landmarks']).any(axis=(1, 2)).sum()) \
+                if len(result['landmarks']) else 0
+            if result['frames']:
+                profile['ms_per_frame'] = round(total_ms / result['frames'], 2)
+
+        if self.profiler is not None:
+            self.profiler.stop()
+            profile['profiler'] = {'samples': sum(self.profiler.samples.values()), 'hot': self.profiler.hot(),
+                                   'path': None}
+            if profile['slow']:
+                path = os.path.join(ANALYSIS_PROFILE_DIR, f'analyze_{time.strftime("%Y%m%d_%H%M%S")}_'
+                                                          f'{threading.get_ident()}.folded')
+                profile['profiler']['path'] = self.profiler.write(path)
+        if profile['slow']:
+            logger.warning('Slow analysis: %.0f ms for %d frames, stages %s, pipeline %s%s', total_ms,
+                           profile['frames'], profile['stages_ms'], profile['pipeline_ms'],
+                           f", stack samples in {profile['profiler']['path']}" if profile['profiler'] else '')
+        return profile
+
+
+def _round(value):
+    return None if value is None else round(value, 1)
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[int(np.searchsorted(self.buckets, value))] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 1),
+            'mean': round(self.sum / self.count, 2) if self.count else None,
+            'buckets': {**{f'le_{bound}': count for bound, count in zip(self.buckets, self.counts)},
+                        'le_inf': self.counts[-1]},
+        }
+
+
+# Histograms over every finished request profile: total and per-stage time, time
+# per frame and peak memory. Bucket counts are per bucket, not cumulative.
+class ProfileHistograms:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.slow = 0
+        self.frames = 0
+        self.no_landmark_frames = 0
+        self._durations = {}
+        self._per_frame = _Histogram(FRAME_BUCKETS_MS)
+        self._memory = _Histogram(MEMORY_BUCKETS_MB)
+
+    def _observe(self, name, ms):
+        if name not in self._durations:
+            self._durations[name] = _Histogram(DURATION_BUCKETS_MS)
+        self._durations[name].observe(ms)
+
+    def record(self, profile):
+        with self._lock:
+            self.requests += 1
+            self.slow += profile['slow']
+            self.frames += profile['frames']
+            self.no_landmark_frames += profile['no_landmark_frames']
+            self._observe('total', profile['total_ms'])
+            for name, ms in {**profile['stages_ms'], **profile['pipeline_ms']}.items():
+                self._observe(name, ms)
+            if profile['ms_per_frame'] is not None:
+                self._per_frame.observe(profile['ms_per_frame'])
+            if profile['memory_mb']['peak'] is not None:
+                self._memory.observe(profile['memory_mb']['peak'])
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'slow_requests': self.slow,
+                'slow_ms': ANALYSIS_PROFILE_SLOW_MS,
+                'profiler': ANALYSIS_PROFILER,
+                'frames': self.frames,
+                'no_landmark_frames': self.no_landmark_frames,
+                'duration_ms': {name: histogram.to_dict() for name, histogram in self._durations.items()},
+                'ms_per_frame': self._per_frame.to_dict(),
+                'peak_memory_mb': self._memory.to_dict(),
+            }
+
+
+analysis_profiles = ProfileHistograms()
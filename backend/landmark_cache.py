@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+LANDMARK_CACHE_DIR = os.getenv("LANDMARK_CACHE_DIR") or os.path.join(tempfile.gettempdir(), 'powerlift_landmarks')
+LANDMARK_CACHE_MAX_MB = float(os.getenv("LANDMARK_CACHE_MAX_MB", 512))
+
+# Bump when the stored landmark layout or the way landmarks are extracted changes,
+# so entries written by older code are never read back
+LANDMARK_CACHE_VERSION = 1
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# On-disk cache of the landmark arrays extracted from uploaded videos, keyed by the
+# video's content hash and the pose settings that produced them (sampling, model
+# complexity, ...). Phase thresholds are deliberately not part of the key: re-scoring
+# a clip with different thresholds reuses its landmarks.
+#
+# Each entry is a raw <key>.npy array, opened memory-mapped on a hit, plus a small
+# <key>.json with the clip's frame rate and size. Files are written under temporary
+# names and renamed into place, with the .json last, so the job worker processes can
+# share one directory. Once the directory grows past max_bytes the least recently
+# used entries are removed.
+class LandmarkCache:
+    def __init__(self, root=LANDMARK_CACHE_DIR, max_bytes=LANDMARK_CACHE_MAX_MB * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def key(self, video_path, settings):
+        settings = {'version': LANDMARK_CACHE_VERSION, **settings}
+        digest = hashlib.sha256(file_digest(video_path).encode())
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def _paths(self, key):
+        return os.path.join(self.root, key + '.npy'), os.path.join(self.root, key + '.json')
+
+    # {'landmarks': read-only memmap of (frames, joints, 2) float32, **metadata}, or None
+    def get(self, key):
+        if not self.enabled:
+            return None
+
+        array_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            landmarks = np.load(array_path, mmap_mode='r')
+            os.utime(meta_path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return {'landmarks': landmarks, **meta}
+
+    def put(self, key, landmarks, **meta):
+        if not self.enabled:
+            return
+
+        os.makedirs(self.root, exist_ok=True)
+        array_path, meta_path = self._paths(key)
+        with tempfile.NamedTemporaryFile(dir=self.root, suffix='.tmp', delete=False) as f:
+            np.save(f, np.ascontiguousarray(landmarks, dtype=np.float32))
+        os.replace(f.name, array_path)
+        with tempfile.NamedTemporaryFile('w', dir=self.root, suffix='.tmp', delete=False) as f:
+            json.dump(meta, f)
+        os.replace(f.name, meta_path)
+
+        self._evict()
+
+    def _entries(self):
+        entries = []
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            key = name[:-len('.json')]
+            array_path, meta_path = self._paths(key)
+            try:
+                size = os.path.getsize(array_path) + os.path.getsize(meta_path)
+                last_used = os.path.getmtime(meta_path)
+            except OSError:
+                continue
+            entries.append((last_used, size, key))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            array_path, meta_path = self._paths(key)
+            for path in (meta_path, array_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def clear(self):
+        for _, _, key in self._entries():
+            for path in self._paths(key)[::-1]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def stats(self):
+        entries = self._entries()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'root': self.root,
+                'enabled': self.enabled,
+                'entries': len(entries),
+                'bytes': sum(size for _, size, _ in entries),
+                'max_bytes': int(self.max_bytes),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'evictions': self.evictions,
+                'oldest_entry_age_s': round(time.time() - min(entries)[0], 1) if entries else None,
+            }
+
+
+landmark_cache = LandmarkCache()
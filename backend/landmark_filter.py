@@ -0,0 +1,81 @@
+import math
+
+import numpy as np
+
+from landmarks import LandmarkSeries
+
+SMOOTHING_MODES = ('none', 'one_euro')
+
+# One-Euro defaults, tuned on the sample clips: a 1 Hz cutoff while the lifter is
+# still removes frame-to-frame jitter, and beta opens the cutoff up with speed
+# (in frame heights per second) so the descent and ascent aren't delayed
+ONE_EURO_MIN_CUTOFF = 1.0
+ONE_EURO_BETA = 20.0
+ONE_EURO_D_CUTOFF = 1.0
+
+
+def _smoothing_factor(dt, cutoff):
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+# Streaming One-Euro filter (Casiez et al., CHI 2012) over a (joints, 2) landmark
+# array, with an adaptive low-pass cutoff per joint. Frames are passed in order
+# with their frame index, so skipped or pose-less frames just lengthen dt.
+class OneEuroFilter:
+    def __init__(self, frame_rate, min_cutoff=ONE_EURO_MIN_CUTOFF, beta=ONE_EURO_BETA, d_cutoff=ONE_EURO_D_CUTOFF):
+        self.frame_rate = frame_rate
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self._last_index = None
+        self._x = None
+        self._dx = None
+
+    # scale is the frame height, so beta doesn't depend on the video resolution
+    def __call__(self, frame_index, landmarks, scale=1.0):
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        if self._x is None:
+            self._last_index = frame_index
+            self._x = landmarks
+            self._dx = np.zeros_like(landmarks)
+            return landmarks
+
+        dt = (frame_index - self._last_index) / self.frame_rate
+        self._last_index = frame_index
+        if dt <= 0:
+            return self._x
+
+        a_d = _smoothing_factor(dt, self.d_cutoff)
+        self._dx = a_d * (landmarks - self._x) / dt + (1 - a_d) * self._dx
+
+        speed = np.linalg.norm(self._dx, axis=-1, keepdims=True) / scale
+        a = _smoothing_factor(dt, self.min_cutoff + self.beta * speed)
+        self._x = a * landmarks + (1 - a) * self._x
+        return self._x
+
+
+def make_filter(smoothing, frame_rate):
+    if smoothing in (None, 'none'):
+        return None
+    if smoothing == 'one_euro':
+        return OneEuroFilter(frame_rate)
+    raise ValueError(f'Unknown smoothing mode {smoothing!r}, expected one of {SMOOTHING_MODES}')
+
+
+# Runs a whole recorded series through the streaming filter, frame by frame as it
+# would have been applied live. Frames without a pose stay NaN.
+def smooth_series(series, smoothing='one_euro', scale=None):
+    landmark_filter = make_filter(smoothing, series.frame_rate)
+    if landmark_filter is None:
+        return series
+
+    if scale is None:
+        scale = np.nanmax(series.points[..., 1]) if series.valid.any() else 1.0
+    points = series.points.copy()
+    for frame_index in np.flatnonzero(series.valid):
+        points[frame_index] = landmark_filter(frame_index, points[frame_index], scale)
+    return LandmarkSeries(points, series.frame_rate)
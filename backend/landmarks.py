@@ -0,0 +1,84 @@
+import numpy as np
+
+# Joint order of the landmark arrays used throughout the posture analysis
+JOINT_NAMES = [
+    'left_shoulder',
+    'right_shoulder',
+    'left_hip',
+    'right_hip',
+    'left_knee',
+    'right_knee',
+    'left_ankle',
+    'right_ankle',
+]
+JOINT_INDEX = {name: i for i, name in enumerate(JOINT_NAMES)}
+
+
+# A clip's landmarks as one contiguous (frames, joints, 2) float32 array of pixel
+# coordinates, NaN for frames where no pose was detected. Slicing a series gives
+# a view, so windows over a clip cost nothing to create.
+class LandmarkSeries:
+    def __init__(self, points, frame_rate=30.0):
+        self.points = np.ascontiguousarray(points, dtype=np.float32)
+        self.frame_rate = frame_rate
+
+    @classmethod
+    def from_frames(cls, frames, frame_rate=30.0):
+        points = np.full((len(frames), len(JOINT_NAMES), 2), np.nan, dtype=np.float32)
+        for i, landmarks in enumerate(frames):
+            if landmarks is not None:
+                points[i] = landmarks
+        return cls(points, frame_rate)
+
+    def __len__(self):
+        return len(self.points)
+
+    def joint(self, name):
+        return self.points[:, JOINT_INDEX[name]]
+
+    @property
+    def valid(self):
+        return ~np.isnan(self.points).any(axis=(1, 2))
+
+    def window(self, start, stop):
+        return LandmarkSeries(self.points[start:stop], self.frame_rate)
+
+
+# Angle at b (degrees) between b->a and b->c for arrays of points shaped (..., 2)
+def angle_between(a, b, c):
+    # Accumulate in float64 so results match the scalar calculate_angle
+    b = np.asarray(b, dtype=np.float64)
+    ba = a - b
+    bc = c - b
+    dot = np.einsum('...i,...i->...', ba, bc)
+    norms = np.linalg.norm(ba, axis=-1) * np.linalg.norm(bc, axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.degrees(np.arccos(dot / norms))
+
+
+def knee_angles(series, side='left'):
+    return angle_between(series.joint(f'{side}_hip'), series.joint(f'{side}_knee'), series.joint(f'{side}_ankle'))
+
+
+def hip_angles(series, side='left'):
+    return angle_between(series.joint(f'{side}_shoulder'), series.joint(f'{side}_hip'), series.joint(f'{side}_knee'))
+
+
+# Torso lean from vertical in degrees (0 = upright), measured hip -> shoulder
+def torso_angles(series, side='left'):
+    torso = series.joint(f'{side}_shoulder') - series.joint(f'{side}_hip')
+    return np.degrees(np.arctan2(np.abs(torso[:, 0]), -torso[:, 1]))
+
+
+def joint_angles(series, side='left'):
+    return {
+        'knee': knee_angles(series, side),
+        'hip': hip_angles(series, side),
+        'torso': torso_angles(series, side),
+    }
+
+
+# (n - window + 1, window) strided view over a per-frame series, for rolling
+# statistics such as sliding_windows(knee, 5).min(axis=1)
+def sliding_windows(values, window):
+    return np.lib.stride_tricks.sliding_window_view(values, window)
@@ -0,0 +1,246 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+
+import cv2
+import numpy as np
+from flask import jsonify
+from flask_sock import Sock
+from simple_websocket import ConnectionClosed
+
+from landmark_filter import SMOOTHING_MODES, make_filter
+from landmarks import JOINT_NAMES
+from pose_pool import PosePool, PosePoolTimeout
+from squat_analyzer import SquatAnalyzer, SquatPhase
+from video_analysis import detect_landmarks
+
+LIVE_MAX_SESSIONS = int(os.getenv("LIVE_MAX_SESSIONS", 256))
+# Sessions streaming JPEG frames each hold an estimator from their own pool for the
+# whole session, so MediaPipe can keep tracking between frames; sessions sending
+# client-side landmarks never touch a pose model and cost only the phase logic
+LIVE_POSE_SESSIONS = int(os.getenv("LIVE_POSE_SESSIONS", 4))
+LIVE_POSE_ACQUIRE_TIMEOUT = float(os.getenv("LIVE_POSE_ACQUIRE_TIMEOUT", 1))
+LIVE_INFERENCE_SIZE = int(os.getenv("LIVE_INFERENCE_SIZE", 480))
+LIVE_IDLE_TIMEOUT = float(os.getenv("LIVE_IDLE_TIMEOUT", 30))
+
+live_pose_pool = PosePool(size=LIVE_POSE_SESSIONS)
+
+
+class LiveProtocolError(Exception):
+    pass
+
+
+# Squat-phase state for one live stream. Frames are pushed one at a time and each
+# push returns the events to send back: phase transitions, feedback changes, and a
+# rep summary when a rep reaches END, after which tracking starts on the next rep.
+class LiveSession:
+    def __init__(self, frame_rate=30.0, frame_size=None, normalized=False, smoothing='none', analyzer_options=None):
+        if normalized and frame_size is None:
+            raise LiveProtocolError('normalized landmarks need the frame width and height')
+        self.frame_rate = frame_rate
+        self.frame_size = frame_size
+        self.normalized = normalized
+        self.analyzer_options = {**(analyzer_options or {}), 'verbose': False}
+        self.landmark_filter = make_filter(smoothing, frame_rate)
+        self.frame_index = -1
+        self.reps = []
+        self._new_rep()
+
+    def _new_rep(self):
+        self.analyzer = SquatAnalyzer(self.frame_rate, **self.analyzer_options)
+        self._feedback = ''
+
+    # landmarks: (joints, 2) in JOINT_NAMES order, in pixels or, for a normalized
+    # session, as fractions of the frame size; None for a frame without a pose
+    def push(self, landmarks, frame_index=None):
+        if landmarks is not None:
+            landmarks = np.asarray(landmarks, dtype=np.float64)
+            if landmarks.shape != (len(JOINT_NAMES), 2):
+                raise LiveProtocolError(f'landmarks must be {len(JOINT_NAMES)} [x, y] pairs in the order '
+                                        f'{JOINT_NAMES}')
+            if self.normalized:
+                landmarks = landmarks * self.frame_size
+        frame_height = self.frame_size[1] if self.frame_size else None
+        return self._update(landmarks, frame_index, frame_height)
+
+    def push_jpeg(self, data, pose, inference_size=LIVE_INFERENCE_SIZE):
+        frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise LiveProtocolError('could not decode the frame as an image')
+        return self._update(detect_landmarks(pose, frame, inference_size), None, frame.shape[0])
+
+    def _update(self, landmarks, frame_index, frame_height):
+        self.frame_index = self.frame_index + 1 if frame_index is None else int(frame_index)
+        if landmarks is None:
+            return []
+        if self.landmark_filter is not None:
+            landmarks = self.landmark_filter(self.frame_index, landmarks, frame_height or np.max(landmarks[:, 1]))
+
+        frame = self.frame_index
+        events = [{'type': 'phase', 'phase': phase.name, 'frame': frame}
+                  for phase in self.analyzer.update(frame, np.trunc(landmarks))]
+        if self.analyzer.feedback != self._feedback:
+            self._feedback = self.analyzer.feedback
+            events.append({'type': 'feedback', 'feedback': self._feedback, 'depth_ok': self.analyzer.depth_ok,
+                           'frame': frame})
+        if self.analyzer.phase == SquatPhase.END:
+            rep = {'rep': len(self.reps) + 1, **self.analyzer.result()}
+            self.reps.append(rep)
+            events.append({'type': 'rep', **rep})
+            self._new_rep()
+        return events
+
+    def summary(self):
+        return {'type': 'summary', 'frames': self.frame_index + 1, 'reps': self.reps}
+
+
+def _session_from_start(message):
+    smoothing = message.get('smoothing', 'none')
+    if smoothing not in SMOOTHING_MODES:
+        raise LiveProtocolError(f'smoothing must be one of {list(SMOOTHING_MODES)}')
+    frame_size = None
+    if message.get('width') and message.get('height'):
+        frame_size = (float(message['width']), float(message['height']))
+    return LiveSession(frame_rate=float(message.get('frame_rate', 30)), frame_size=frame_size,
+                       normalized=bool(message.get('normalized', False)), smoothing=smoothing,
+                       analyzer_options={'require_hip_below_knee': bool(message.get('require_hip_below_knee'))})
+
+
+# Live squat feedback over a WebSocket at /live. Protocol, one message per frame:
+#   -> {"type": "start", "frame_rate": 30, "width": 720, "height": 1280,
+#       "normalized": false, "smoothing": "none"}            optional, first
+#   -> {"type": "landmarks", "frame": 12, "landmarks": [[x, y], ...] | null}
+#   -> <binary JPEG frame>
+#   -> {"type": "stop"}
+#   <- {"type": "phase", "phase": "DESCENT", "frame": 12}
+#   <- {"type": "feedback", "feedback": "Good squat depth!", "depth_ok": true, "frame": 40}
+#   <- {"type": "rep", "rep": 1, "phase_frames": [...], "lowest_knee_angle": 78.6, ...}
+#   <- {"type": "summary", "frames": 300, "reps": [...]}           on stop
+#   <- {"type": "error", "error": "..."}
+# Each session runs on its connection's own thread, so the server must be threaded
+# (or use gevent/eventlet workers); LIVE_MAX_SESSIONS bounds them.
+class LiveFeedback:
+    def __init__(self, max_sessions=LIVE_MAX_SESSIONS, pose_pool=live_pose_pool):
+        self.max_sessions = max_sessions
+        self.pose_pool = pose_pool
+        self._lock = threading.Lock()
+        self.active = 0
+        self.sessions = 0
+        self.rejected = 0
+        self.frames = 0
+        self.errors = 0
+        self._latencies_ms = deque(maxlen=10000)
+
+    def _open(self):
+        with self._lock:
+            if self.active >= self.max_sessions:
+                self.rejected += 1
+                return False
+            self.active += 1
+            self.sessions += 1
+            return True
+
+    def _close(self):
+        with self._lock:
+            self.active -= 1
+
+    def _record(self, started):
+        with self._lock:
+            self.frames += 1
+            self._latencies_ms.append((time.perf_counter() - started) * 1000)
+
+    def _send(self, ws, events):
+        for event in events:
+            ws.send(json.dumps(event))
+
+    def handle(self, ws):
+        if not self._open():
+            self._send(ws, [{'type': 'error', 'error': f'Too many live sessions ({self.max_sessions})'}])
+            return
+
+        session = None
+        pose = None
+        with ExitStack() as leases:
+            try:
+                while True:
+                    message = ws.receive(timeout=LIVE_IDLE_TIMEOUT)
+                    if message is None:
+                        break
+                    started = time.perf_counter()
+                    try:
+                        if isinstance(message, bytes):
+                            if session is None:
+                                session = LiveSession()
+                            if pose is None:
+                                pose = leases.enter_context(self.pose_pool.acquire(timeout=LIVE_POSE_ACQUIRE_TIMEOUT))
+                            events = session.push_jpeg(message, pose)
+                        else:
+                            message = json.loads(message)
+                            if not isinstance(message, dict):
+                                raise LiveProtocolError('expected a JSON object')
+                            kind = message.get('type')
+                            if kind == 'start':
+                                session = _session_from_start(message)
+                                events = []
+                            elif kind == 'landmarks':
+                                if session is None:
+                                    session = LiveSession()
+                                events = session.push(message.get('landmarks'), message.get('frame'))
+                            elif kind == 'stop':
+                                self._send(ws, [session.summary() if session else LiveSession().summary()])
+                                break
+                            else:
+                                raise LiveProtocolError(f'unknown message type {kind!r}')
+                    except PosePoolTimeout:
+                        events = [{'type': 'error', 'error': 'No pose estimator is free for JPEG frames; '
+                                                             'send client-side landmarks instead'}]
+                    except (LiveProtocolError, ValueError, TypeError) as e:
+                        with self._lock:
+                            self.errors += 1
+                        events = [{'type': 'error', 'error': str(e)}]
+                    self._send(ws, events)
+                    self._record(started)
+            except ConnectionClosed:
+                pass
+            finally:
+                self._close()
+
+    def stats(self):
+        with self._lock:
+            latencies = np.array(self._latencies_ms) if self._latencies_ms else None
+            return {
+                'active_sessions': self.active,
+                'max_sessions': self.max_sessions,
+                'sessions': self.sessions,
+                'rejected': self.rejected,
+                'frames': self.frames,
+                'errors': self.errors,
+                'pose_pool': self.pose_pool.stats(),
+                'latency_ms': None if latencies is None else {
+                    'samples': len(latencies),
+                    'p50': round(float(np.percentile(latencies, 50)), 3),
+                    'p95': round(float(np.percentile(latencies, 95)), 3),
+                    'p99': round(float(np.percentile(latencies, 99)), 3),
+                    'max': round(float(latencies.max()), 3),
+                },
+            }
+
+
+live_feedback = LiveFeedback()
+
+
+def init_live_feedback(app):
+    sock = Sock(app)
+
+    @sock.route('/live')
+    def live(ws):
+        live_feedback.handle(ws)
+
+    @app.route('/live_stats', methods=['GET'])
+    def live_stats():
+        return jsonify(live_feedback.stats()), 200
+
+    return sock
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from datetime import datetime
+
+from score_mlp import load_score_mlp
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def file_version(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()[:12]
+
+
+# Loads each model artifact once per process and shares it across requests
+class ModelRegistry:
+    def __init__(self, model_dir=MODEL_DIR):
+        self.model_dir = model_dir
+        self._artifacts = {}
+        self._entries = {}
+        self._locks = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name, filename, loader):
+        with self._registry_lock:
+            self._artifacts[name] = (filename, loader)
+            self._locks[name] = threading.Lock()
+
+    def get(self, name):
+        entry = self._entries.get(name)
+        if entry is None:
+            # Double-checked so concurrent first requests only load the artifact once
+            with self._locks[name]:
+                entry = self._entries.get(name)
+                if entry is None:
+                    entry = self._load(name)
+                    self._entries[name] = entry
+        return entry["model"]
+
+    def load_all(self):
+        for name in list(self._artifacts):
+            self.get(name)
+
+    def status(self):
+        status = {}
+        for name, (filename, _) in self._artifacts.items():
+            entry = self._entries.get(name)
+            status[name] = {
+                "file": filename,
+                "loaded": entry is not None,
+                "version": entry["version"] if entry else None,
+                "load_time_ms": entry["load_time_ms"] if entry else None,
+                "loaded_at": entry["loaded_at"] if entry else None,
+            }
+        return status
+
+    def _load(self, name):
+        filename, loader = self._artifacts[name]
+        path = os.path.join(self.model_dir, filename)
+
+        start = time.perf_counter()
+        model = loader(path)
+        load_time_ms = (time.perf_counter() - start) * 1000
+
+        entry = {
+            "model": model,
+            "version": file_version(path),
+            "load_time_ms": round(load_time_ms, 2),
+            "loaded_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        print(f"Loaded {name} from {filename} in {entry['load_time_ms']} ms (version {entry['version']})")
+        return entry
+
+
+model_registry = ModelRegistry()
+# NumPy export of score_model.h5 with score_scaler.pkl folded in (see score_mlp.py)
+model_registry.register("score_model", "score_model.npz", load_score_mlp)
+model_registry.register("rank_scaler", "rank_scaler.pkl", load_pickle)
+model_registry.register("rank_model", "rank_model.pkl", load_pickle)
@@ -0,0 +1,143 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import mediapipe as mp
+import numpy as np
+
+POSE_POOL_SIZE = int(os.getenv("POSE_POOL_SIZE", os.cpu_count() or 1))
+POSE_MODEL_COMPLEXITY = int(os.getenv("POSE_MODEL_COMPLEXITY", 1))
+POSE_ACQUIRE_TIMEOUT = float(os.getenv("POSE_ACQUIRE_TIMEOUT", 60))
+
+
+class PosePoolTimeout(Exception):
+    pass
+
+
+# Bounded pool of MediaPipe Pose estimators. Requests check an estimator out,
+# run a whole video through it and return it; the graph is reset on return so
+# tracking state never leaks from one video into the next.
+class PosePool:
+    def __init__(self, size=POSE_POOL_SIZE, model_complexity=POSE_MODEL_COMPLEXITY, **pose_kwargs):
+        self.size = size
+        self.model_complexity = model_complexity
+        self.pose_kwargs = pose_kwargs
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self._wait_times_ms = deque(maxlen=1000)
+
+    def _create(self):
+        return mp.solutions.pose.Pose(model_complexity=self.model_complexity, **self.pose_kwargs)
+
+    def _checkout(self, timeout):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._create()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self.timeouts += 1
+            raise PosePoolTimeout(f'No pose estimator became available within {timeout}s')
+
+    def _release(self, pose):
+        try:
+            pose.reset()
+        except Exception:
+            # A graph that can't be reset is dropped; a fresh one is created on demand
+            with self._lock:
+                self._created -= 1
+            pose.close()
+            return
+        self._idle.put(pose)
+
+    @contextmanager
+    def acquire(self, timeout=POSE_ACQUIRE_TIMEOUT):
+        start = time.perf_counter()
+        pose = self._checkout(timeout)
+        wait_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.checkouts += 1
+            self._in_use += 1
+            self._wait_times_ms.append(wait_ms)
+        try:
+            yield pose
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._release(pose)
+
+    # The estimator options; anything that changes the landmarks they produce
+    def settings(self):
+        return {'model_complexity': self.model_complexity, **self.pose_kwargs}
+
+    # Builds every estimator up front and pushes a blank frame through each one,
+    # so the first real requests don't pay for graph initialization
+    def warm_up(self, frame_size=(256, 256)):
+        blank = np.zeros((frame_size[1], frame_size[0], 3), dtype=np.uint8)
+        poses = []
+        while True:
+            with self._lock:
+                if self._created >= self.size:
+                    break
+                self._created += 1
+            poses.append(self._create())
+        for pose in poses:
+            pose.process(blank)
+            self._release(pose)
+
+    def stats(self):
+        with self._lock:
+            waits = np.array(self._wait_times_ms) if self._wait_times_ms else None
+            return {
+                'size': self.size,
+                'model_complexity': self.model_complexity,
+                'created': self._created,
+                'in_use': self._in_use,
+                'idle': self._idle.qsize(),
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_ms': None if waits is None else {
+                    'samples': len(waits),
+                    'mean': round(float(waits.mean()), 2),
+                    'p50': round(float(np.percentile(waits, 50)), 2),
+                    'p95': round(float(np.percentile(waits, 95)), 2),
+                    'max': round(float(waits.max()), 2),
+                },
+            }
+
+    def close(self):
+        while True:
+            try:
+                pose = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            pose.close()
+            with self._lock:
+                self._created -= 1
+
+
+pose_pool = PosePool()
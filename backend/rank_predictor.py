@@ -0,0 +1,108 @@
+from datetime import datetime
+
+import numpy as np
+
+from model_registry import model_registry
+from prediction_cache import feature_key, prediction_cache
+
+
+def rc_elm_predict(X, W, b, beta):
+    H = np.tanh(np.dot(X, W.T) + b)
+    return np.dot(H, beta)
+
+
+def calculate_age(dob, today):
+    return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+
+
+def score_features(user, event_date, today):
+    dob = datetime.strptime(user.dob, '%Y-%m-%d')
+    event_date = datetime.strptime(f'{event_date} 2025', '%d %b %Y')
+    age = calculate_age(dob, today)
+    diffDays = (event_date - today).days
+
+    return [
+        1 if user.gender == 'Male' else 0,
+        1 if user.equipment == 'Equipped' else 0,
+        age,
+        user.weight,
+        user.squatPR,
+        user.benchPR,
+        user.deadliftPR,
+        diffDays,
+        1 if user.equipment == 'Equipped' else 0,
+        age,
+        user.weight
+    ]
+
+
+# The rank model's equipment and age-category inputs, as the event and age decide them
+def event_flags(event_id, age):
+    return [
+        0 if event_id == 2 else 1,
+        2 if event_id in [4, 5] else 0 if age <= 19 else 1,
+    ]
+
+
+def rank_features(user, event_id, age, score_pred):
+    return [
+        0 if user.gender == 'Male' else 1,
+        *event_flags(event_id, age),
+        user.weight,
+        score_pred[0],
+        score_pred[1],
+        score_pred[2]
+    ]
+
+
+def round_to_plate(weight):
+    return str(int(round(weight / 5)) * 5)
+
+
+def run_models(items, score_rows):
+    # The score scaler is folded into the model's first layer
+    score_pred = model_registry.get('score_model').predict(score_rows)
+
+    # Age is the third score feature
+    rank_rows = [rank_features(user, event_id, row[2], pred)
+                 for (user, event_id, _), row, pred in zip(items, score_rows, score_pred)]
+    rank_input_scaled = model_registry.get('rank_scaler').transform(np.array(rank_rows, dtype=np.float64))
+
+    rank_model_params = model_registry.get('rank_model')
+    rank_pred = rc_elm_predict(rank_input_scaled, rank_model_params['W'],
+                               rank_model_params['b'], rank_model_params['beta'])
+
+    return [
+        {
+            'rank_score': f"{round(int(rank[0]))}",
+            'default_squat_weight': round_to_plate(score[0]),
+            'default_bench_weight': round_to_plate(score[1]),
+            'default_deadlift_weight': round_to_plate(score[2]),
+        }
+        for rank, score in zip(rank_pred, score_pred)
+    ]
+
+
+# Predicts rank and default attempt weights for many (user, event_id, event_date)
+# tuples, running the score model and the RC-ELM rank model once on the whole batch.
+# Results are cached by the models' inputs (the score features, which also carry
+# the lifter's sex and weight, plus the rank model's event flags), so only cache
+# misses reach the models.
+def predict_rank_scores(items, today=None):
+    if not items:
+        return []
+    today = today or datetime.today()
+
+    score_rows = [score_features(user, event_date, today) for user, _, event_date in items]
+    keys = [feature_key(row + event_flags(event_id, row[2])) for row, (_, event_id, _) in zip(score_rows, items)]
+    results = [prediction_cache.get(key) for key in keys]
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        predictions = run_models([items[i] for i in missing], [score_rows[i] for i in missing])
+        for i, prediction in zip(missing, predictions):
+            prediction_cache.put(keys[i], prediction, user_id=getattr(items[i][0], 'id', None))
+            results[i] = prediction
+
+    # Copies so callers can annotate results without touching cached entries
+    return [dict(result) for result in results]
@@ -0,0 +1,112 @@
+import numpy as np
+
+from landmarks import LandmarkSeries, knee_angles
+from squat_analyzer import HIP, KNEE, SHOULDER
+
+# Knee angle above which the lifter counts as standing, and how far below that it
+# has to drop before a rep starts. The gap between the two is the hysteresis band
+# that keeps jitter around a single threshold from splitting or inventing reps.
+STANDING_KNEE_ANGLE = 160
+REP_MIN_KNEE_DROP = 40
+
+
+# Per-frame series with the gaps where no pose was found linearly interpolated
+def fill_gaps(values):
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    if valid.all() or not valid.any():
+        return values
+    indices = np.arange(len(values))
+    return np.interp(indices, indices[valid], values[valid])
+
+
+# Hysteresis: 1 while standing, -1 while in a rep, carried forward through frames
+# inside the band. Frames before the first decisive one count as standing.
+def hysteresis_states(knee, high, low):
+    states = np.where(knee > high, 1, np.where(knee < low, -1, 0))
+    decided = np.where(states != 0, np.arange(len(states)), -1)
+    np.maximum.accumulate(decided, out=decided)
+    return np.where(decided >= 0, states[np.maximum(decided, 0)], 1)
+
+
+# First index of each segment's minimum, for segments given by their start indices
+def segment_argmin(values, starts):
+    values, starts, offset = values[starts[0]:], starts - starts[0], starts[0]
+    mins = np.minimum.reduceat(values, starts)
+    lengths = np.diff(np.append(starts, len(values)))
+    positions = np.where(values == np.repeat(mins, lengths), np.arange(len(values)), len(values))
+    return np.minimum.reduceat(positions, starts) + offset, mins
+
+
+# Splits a whole set into reps from the knee angle and shoulder height series in a
+# single vectorized pass, where SquatAnalyzer follows one rep and stops at END.
+#
+# A rep starts on the last standing frame before the knee angle drops below
+# standing_angle - min_drop and ends on the first frame it is back above
+# standing_angle; its bottom is the frame with the smallest knee angle. depth_ok
+# compares that angle with bottom_knee_angle (and, with require_hip_below_knee,
+# checks the hip got below the knee), and tempo is the descent and ascent time.
+# Unlike SquatAnalyzer there is no one-second descent timeout, so a slow rep that
+# does reach depth counts as deep here.
+# A rep still in progress when the video ends is returned with complete=False; one
+# already under way when it starts (the ascent of a clip cut mid-squat) is skipped.
+def segment_reps(series, bottom_knee_angle=95, require_hip_below_knee=False, standing_angle=STANDING_KNEE_ANGLE,
+                 min_drop=REP_MIN_KNEE_DROP):
+    if len(series) == 0 or not series.valid.any():
+        return []
+
+    pixels = LandmarkSeries(np.trunc(series.points), series.frame_rate)
+    knee = fill_gaps(knee_angles(pixels))
+    shoulder_y = fill_gaps(pixels.points[:, SHOULDER, 1])
+    # Image y grows downwards: positive when the hip is below the knee
+    hip_below = fill_gaps(pixels.points[:, HIP, 1] - pixels.points[:, KNEE, 1])
+
+    states = hysteresis_states(knee, standing_angle, standing_angle - min_drop)
+    changes = np.flatnonzero(np.diff(states)) + 1
+    if not len(changes):
+        return []
+    # A rep runs from the last frame above standing_angle before the drop (the start
+    # of the descent) to the first frame back above it
+    last_standing = np.where(knee > standing_angle, np.arange(len(knee)), 0)
+    np.maximum.accumulate(last_standing, out=last_standing)
+    starts = last_standing[changes[states[changes] == -1]]
+    if not len(starts):
+        # The clip starts mid-rep and only rises back to standing: no whole rep
+        return []
+    ends = changes[states[changes] == 1]
+    ends = ends[ends > starts[0]]
+    complete = np.arange(len(starts)) < len(ends)
+    ends = np.append(ends, np.full(len(starts) - len(ends), len(knee) - 1))
+
+    # Per-rep reductions over [start, end] in one pass: reduceat over the rep
+    # starts, with each rep's tail up to the next start masked out
+    in_rep = np.zeros(len(knee) + 1, dtype=np.int64)
+    np.add.at(in_rep, starts, 1)
+    np.add.at(in_rep, ends + 1, -1)
+    in_rep = np.cumsum(in_rep[:-1]) > 0
+    bottoms, lowest = segment_argmin(np.where(in_rep, knee, np.inf), starts)
+    deepest_hip = np.maximum.reduceat(np.where(in_rep, hip_below, -np.inf), starts)
+    lowest_shoulder = np.maximum.reduceat(np.where(in_rep, shoulder_y, -np.inf), starts)
+
+    depth_ok = lowest < bottom_knee_angle
+    if require_hip_below_knee:
+        depth_ok &= deepest_hip > 0
+
+    frame_rate = series.frame_rate
+    reps = []
+    for i in range(len(starts)):
+        start, bottom, end = int(starts[i]), int(bottoms[i]), int(ends[i])
+        reps.append({
+            'start': start,
+            'bottom': bottom,
+            'end': end,
+            'complete': bool(complete[i]),
+            'lowest_knee_angle': round(float(lowest[i]), 2),
+            'depth_ok': bool(depth_ok[i]),
+            # Shoulder drop at the bottom relative to standing height, as in the 1.05 descent check
+            'shoulder_drop': round(float(lowest_shoulder[i] / shoulder_y[start]), 3),
+            'descent_s': round((bottom - start) / frame_rate, 3),
+            'ascent_s': round((end - bottom) / frame_rate, 3),
+            'duration_s': round((end - start) / frame_rate, 3),
+        })
+    return reps
@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+ACTIVATIONS = {
+    'relu': lambda x: np.maximum(x, 0),
+    'linear': lambda x: x,
+}
+
+
+# Pure NumPy forward pass of the exported score model. The StandardScaler is
+# folded into the first layer, so predict() takes raw (unscaled) features.
+class ScoreMLP:
+    def __init__(self, weights, biases, activations):
+        self.weights = weights
+        self.biases = biases
+        self.activations = activations
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            n_layers = int(data['n_layers'])
+            weights = [data[f'W{i}'] for i in range(n_layers)]
+            biases = [data[f'b{i}'] for i in range(n_layers)]
+            activations = [str(a) for a in data['activations']]
+        return cls(weights, biases, activations)
+
+    def predict(self, X):
+        h = np.asarray(X, dtype=np.float32)
+        for W, b, activation in zip(self.weights, self.biases, self.activations):
+            h = ACTIVATIONS[activation](h @ W + b)
+        return h
+
+
+def read_h5_dense_layers(h5_path):
+    import h5py
+
+    layers = []
+    with h5py.File(h5_path, 'r') as f:
+        config = json.loads(f.attrs['model_config'])
+        activations = {layer['config']['name']: layer['config'].get('activation', 'linear')
+                       for layer in config['config']['layers'] if layer['class_name'] == 'Dense'}
+
+        model_weights = f['model_weights']
+        for name in model_weights.attrs['layer_names']:
+            name = name.decode() if isinstance(name, bytes) else name
+            group = model_weights[name]
+            weight_names = [w.decode() if isinstance(w, bytes) else w for w in group.attrs['weight_names']]
+            if not weight_names:
+                continue
+            kernel = next(group[w][()] for w in weight_names if 'kernel' in w)
+            bias = next(group[w][()] for w in weight_names if 'bias' in w)
+            layers.append((kernel, bias, activations[name]))
+    return layers
+
+
+# Converts score_model.h5 + score_scaler.pkl into a compact .npz of float32 weights.
+# Only h5py is needed, not TensorFlow.
+def export_score_model(h5_path, scaler_path, out_path):
+    layers = read_h5_dense_layers(h5_path)
+    with open(scaler_path, 'rb') as f:
+        scaler = pickle.load(f)
+
+    # (x - mean) / scale @ W + b  ==  x @ (W / scale[:, None]) + (b - (mean / scale) @ W)
+    W0, b0, activation0 = layers[0]
+    mean = scaler.mean_.astype(np.float64)
+    scale = scaler.scale_.astype(np.float64)
+    folded_W0 = W0.astype(np.float64) / scale[:, None]
+    folded_b0 = b0.astype(np.float64) - (mean / scale) @ W0.astype(np.float64)
+    layers[0] = (folded_W0, folded_b0, activation0)
+
+    arrays = {'n_layers': np.array(len(layers)),
+              'activations': np.array([activation for _, _, activation in layers])}
+    for i, (W, b, _) in enumerate(layers):
+        arrays[f'W{i}'] = W.astype(np.float32)
+        arrays[f'b{i}'] = b.astype(np.float32)
+    # Written to a temporary file and renamed into place, so a server worker loading
+    # the model while another one re-exports it never sees a half-written file
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(out_path)), suffix='.tmp',
+                                     delete=False) as f:
+        np.savez(f, **arrays)
+    os.replace(f.name, out_path)
+    return ScoreMLP.load(out_path)
+
+
+# Compares the exported model against Keras on random inputs around the scaler's
+# training distribution. Imports TensorFlow, so only meant for offline checks.
+def verify_export(h5_path, scaler_path, npz_path, n_samples=1000, rtol=1e-3, atol=1e-2):
+    from tensorflow import keras
+
+    with open(scaler_path, 'rb') as f:
+        scaler = pickle.load(f)
+    rng = np.random.default_rng(0)
+    X = scaler.mean_ + rng.standard_normal((n_samples, len(scaler.mean_))) * scaler.scale_
+
+    expected = keras.models.load_model(h5_path, compile=False).predict(scaler.transform(X), verbose=0)
+    actual = ScoreMLP.load(npz_path).predict(X)
+    max_abs_diff = float(np.max(np.abs(expected - actual)))
+    print(f'Max abs difference vs Keras over {n_samples} samples: {max_abs_diff:.6f}')
+    return np.allclose(expected, actual, rtol=rtol, atol=atol)
+
+
+# Loads the .npz at path, exporting it first from the score_model.h5 and
+# score_scaler.pkl next to it when it is missing or older than either of them (the
+# model was retrained). A stale export that can't be redone is still served, with
+# a warning.
+def load_score_mlp(path):
+    base_dir = os.path.dirname(path)
+    h5_path = os.path.join(base_dir, 'score_model.h5')
+    scaler_path = os.path.join(base_dir, 'score_scaler.pkl')
+    if not os.path.exists(path):
+        return export_score_model(h5_path, scaler_path, path)
+
+    exported_at = os.path.getmtime(path)
+    if any(os.path.exists(source) and os.path.getmtime(source) > exported_at for source in (h5_path, scaler_path)):
+        try:
+            return export_score_model(h5_path, scaler_path, path)
+        except Exception as e:
+            print(f'Warning: {path} is older than {h5_path} or {scaler_path} and could not be re-exported '
+                  f'({e}); serving the old export')
+    return ScoreMLP.load(path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export score_model.h5 to a NumPy weights file')
+    parser.add_argument('--model', default='score_model.h5')
+    parser.add_argument('--scaler', default='score_scaler.pkl')
+    parser.add_argument('--out', default='score_model.npz')
+    parser.add_argument('--verify', action='store_true', help='compare against Keras (needs TensorFlow)')
+    args = parser.parse_args()
+
+    export_score_model(args.model, args.scaler, args.out)
+    print(f'Exported {args.model} + {args.scaler} to {args.out} ({os.path.getsize(args.out)} bytes)')
+
+    if args.verify and not verify_export(args.model, args.scaler, args.out):
+        raise SystemExit('Exported model does not match Keras predictions')
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+
+from flask import Request, g, send_file
+from werkzeug.wsgi import ClosingIterator
+
+# Root for per-request scratch directories (defaults to the system temp dir)
+SCRATCH_ROOT = os.getenv("SCRATCH_ROOT") or None
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+
+# Each request gets its own scratch directory, created on first use and removed
+# when the request ends, so concurrent uploads never share file names.
+def request_scratch_dir():
+    if 'scratch_dir' not in g:
+        g.scratch_dir = tempfile.mkdtemp(prefix='powerlift_', dir=SCRATCH_ROOT)
+    return g.scratch_dir
+
+
+def remove_scratch_dir(path):
+    shutil.rmtree(path, ignore_errors=True)
+
+
+# Multipart file parts are streamed straight into the request's scratch directory
+# instead of being spooled by Werkzeug and copied again on save().
+class ScratchRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        suffix = os.path.splitext(filename or '')[1]
+        return tempfile.NamedTemporaryFile('wb+', dir=request_scratch_dir(), prefix='upload_',
+                                           suffix=suffix, delete=False)
+
+
+# Returns a path on disk for an uploaded file, reusing the file the upload was
+# streamed into when possible and otherwise copying it over in chunks.
+def save_upload(file_storage, filename):
+    scratch_dir = request_scratch_dir()
+    stream = file_storage.stream
+    stream_path = getattr(stream, 'name', None)
+
+    if isinstance(stream_path, str) and os.path.dirname(stream_path) == scratch_dir:
+        stream.flush()
+        return stream_path
+
+    path = os.path.join(scratch_dir, filename)
+    with open(path, 'wb') as f:
+        shutil.copyfileobj(stream, f, UPLOAD_CHUNK_SIZE)
+    return path
+
+
+# Sends a file out of the scratch directory and removes the directory only once
+# the response has been fully written.
+def send_scratch_file(path, **kwargs):
+    response = send_file(path, **kwargs)
+    scratch_dir = g.pop('scratch_dir', None)
+    if scratch_dir is not None:
+        # send_file responses are direct passthrough, which skips call_on_close
+        # callbacks, so the cleanup has to wrap the body iterator itself
+        response.response = ClosingIterator(response.response, lambda: remove_scratch_dir(scratch_dir))
+    return response
+
+
+def cleanup_scratch_dir(exc=None):
+    scratch_dir = g.pop('scratch_dir', None)
+    if scratch_dir is not None:
+        remove_scratch_dir(scratch_dir)
+
+
+def init_scratch(app):
+    app.request_class = ScratchRequest
+    app.teardown_request(cleanup_scratch_dir)
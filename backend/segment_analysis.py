@@ -0,0 +1,148 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from landmark_filter import make_filter
+from landmarks import JOINT_NAMES
+from pose_pool import POSE_MODEL_COMPLEXITY, PosePool
+from video_analysis import FrameSampler, VideoAnalysisError, iter_pose_frames
+
+SEGMENT_WORKERS = int(os.getenv("SEGMENT_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+# Shortest segment worth a process of its own, and how many extra frames each
+# segment decodes on either side so MediaPipe's tracking and landmark smoothing have
+# settled, and interpolation has a keyframe to work with, by the segment boundary.
+# Tracking never converges bit-for-bit, so landmarks differ from a serial run by a
+# few pixels; 60 frames of overlap keeps phase frames identical on the sample clips.
+SEGMENT_MIN_FRAMES = int(os.getenv("SEGMENT_MIN_FRAMES", 300))
+SEGMENT_OVERLAP = int(os.getenv("SEGMENT_OVERLAP", 60))
+
+# Each worker process keeps one pose estimator for its lifetime
+_worker_pose_pool = None
+
+
+def _init_worker(pose_settings):
+    global _worker_pose_pool
+    _worker_pose_pool = PosePool(size=1, **pose_settings)
+
+
+# (read_start, keep_start, keep_stop, read_stop) per segment. Segments keep
+# consecutive, non-overlapping frame ranges but read overlap frames either side;
+# read_start is aligned to the sampling interval so keyframes fall on the same
+# frames as in a serial run. The last segment reads to the end of the video.
+def plan_segments(total_frames, segments, overlap=SEGMENT_OVERLAP, interval=1, min_frames=SEGMENT_MIN_FRAMES):
+    segments = max(1, min(segments, total_frames // min_frames))
+    bounds = [round(total_frames * i / segments) for i in range(segments + 1)]
+    plan = []
+    for i in range(segments):
+        keep_start, keep_stop = bounds[i], bounds[i + 1]
+        read_start = max(0, keep_start - overlap) // interval * interval
+        read_stop = keep_stop + overlap if i < segments - 1 else None
+        plan.append((read_start, keep_start, None if read_stop is None else keep_stop, read_stop))
+    return plan
+
+
+def _read_range(cap, read_stop):
+    frame_index = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    while read_stop is None or frame_index < read_stop:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        yield frame
+        frame_index += 1
+
+
+# Worker: pose landmarks for frames [keep_start, keep_stop) as a (frames, joints, 2)
+# float32 array (NaN where no pose was found), plus the number of pose.process calls
+def extract_segment(input_video_path, read_start, keep_start, keep_stop, read_stop, sampling, target_fps,
+                    inference_size, smoothing):
+    cap = cv2.VideoCapture(input_video_path)
+    if not cap.isOpened():
+        raise VideoAnalysisError('Failed to process the video')
+    frame_rate = cap.get(cv2.CAP_PROP_FPS) or 30
+    if read_start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, read_start)
+        if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != read_start:
+            raise VideoAnalysisError(f'Could not seek to frame {read_start}')
+
+    kept = []
+    pose_frames = 0
+    sampler = FrameSampler(frame_rate, mode=sampling, target_fps=target_fps)
+    try:
+        with _worker_pose_pool.acquire() as pose:
+            frames = iter_pose_frames(_read_range(cap, read_stop), pose, sampler, inference_size,
+                                      make_filter(smoothing, frame_rate))
+            for frame_index, _, landmarks, is_keyframe in frames:
+                frame_index += read_start
+                if frame_index < keep_start or (keep_stop is not None and frame_index >= keep_stop):
+                    continue
+                kept.append(landmarks)
+                pose_frames += is_keyframe
+    finally:
+        cap.release()
+
+    points = np.full((len(kept), len(JOINT_NAMES), 2), np.nan, dtype=np.float32)
+    for i, landmarks in enumerate(kept):
+        if landmarks is not None:
+            points[i] = landmarks
+    return points, pose_frames
+
+
+# Splits long videos into overlapping time segments and runs each segment's pose
+# extraction on its own worker process. The stitched landmark stream comes back in
+# the same shape as a landmark cache entry, so phase analysis and rendering run
+# once over it through analyze_video(cached=...), exactly as for a cache hit.
+class SegmentedExtractor:
+    def __init__(self, max_workers=SEGMENT_WORKERS, model_complexity=POSE_MODEL_COMPLEXITY, **pose_kwargs):
+        self.max_workers = max_workers
+        self.pose_settings = {'model_complexity': model_complexity, **pose_kwargs}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers re-import the main script (server.py) as __mp_main__;
+                # its startup work stays under if __name__ == '__main__'
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'),
+                                                     initializer=_init_worker, initargs=(self.pose_settings,))
+            return self._executor
+
+    def extract(self, input_video_path, segments=None, sampling='fixed', target_fps=30, inference_size=None,
+                smoothing='none', overlap=SEGMENT_OVERLAP, min_frames=SEGMENT_MIN_FRAMES):
+        cap = cv2.VideoCapture(input_video_path)
+        if not cap.isOpened():
+            raise VideoAnalysisError('Failed to process the video')
+        frame_rate = cap.get(cv2.CAP_PROP_FPS) or 30
+        frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+        interval = FrameSampler(frame_rate, mode=sampling, target_fps=target_fps).max_interval
+        plan = plan_segments(total_frames, segments or self.max_workers, overlap, interval, min_frames)
+        executor = self._get_executor()
+        futures = [executor.submit(extract_segment, input_video_path, *bounds, sampling, target_fps, inference_size,
+                                   smoothing)
+                   for bounds in plan]
+        parts = [future.result() for future in futures]
+
+        return {
+            'landmarks': np.concatenate([points for points, _ in parts]),
+            'frame_rate': frame_rate,
+            'frame_size': frame_size,
+            'pose_frames': sum(pose_frames for _, pose_frames in parts),
+            'segments': len(plan),
+        }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+
+segmented_extractor = SegmentedExtractor()
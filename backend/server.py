@@ -1,25 +1,32 @@
+import json
 import os
-os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
-
-import pickle
-from tensorflow import keras
-import cv2
 import numpy as np
-import mediapipe as mp
-from enum import Enum
 from flask import Flask, request, jsonify, send_file
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from langchain_groq import ChatGroq
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
 from dotenv import load_dotenv
 from datetime import datetime
 import random
+import threading
+from model_registry import model_registry
+from rank_predictor import predict_rank_scores
+from prediction_cache import prediction_cache
+from analysis_jobs import JobQueueFull, analysis_jobs
+from analysis_outputs import add_outputs, parse_outputs, render_options, video_output
+from analysis_profile import RequestProfile, analysis_profiles
+from pose_pool import PosePoolTimeout, pose_pool
+from scratch import init_scratch, request_scratch_dir, save_upload, send_scratch_file
+from landmark_cache import landmark_cache
+from landmark_filter import SMOOTHING_MODES
+from live_feedback import init_live_feedback
+from video_analysis import SAMPLING_MODES, VideoAnalysisError, analyze_video_cached, result_to_json
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///users.db'
+init_scratch(app)
+# WebSocket /live endpoint for streaming squat feedback, plus /live_stats
+init_live_feedback(app)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///users.db')
 app.config['SECRET_KEY'] = 'your_secret_key'
 
 db = SQLAlchemy(app)
@@ -73,6 +80,7 @@ def register():
                 experienceLevel=experienceLevel, equipment=equipment)
     db.session.add(user)
     db.session.commit()
+    prediction_cache.invalidate_user(user.id)
     print("User registered successfully")
     return jsonify({'message': 'User registered successfully'}), 201
 
@@ -137,6 +145,7 @@ def update_user():
     current_user.experienceLevel = data.get('experienceLevel', current_user.experienceLevel)
     current_user.equipment = data.get('equipment', current_user.equipment)
     db.session.commit()
+    prediction_cache.invalidate_user(current_user.id)
     return jsonify({'message': 'User data updated successfully'})
 
 @app.route('/set_goal', methods=['POST'])
@@ -174,65 +183,44 @@ def get_rank_score():
 
     user = User.query.filter_by(id=currUserId).first()
 
-    dob = datetime.strptime(user.dob, '%Y-%m-%d')
-    event_date = datetime.strptime(f'{event_date} 2025', '%d %b %Y')
-    today = datetime.today()
-    age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-    diffDays = (event_date - today).days
-
-    score_scaler = pickle.load(open("score_scaler.pkl", "rb"))
-    score_model = keras.models.load_model('score_model.h5')
-
-    score_input_scaled = score_scaler.transform([[
-        1 if user.gender == 'Male' else 0,
-        1 if user.equipment == 'Equipped' else 0,
-        age,
-        user.weight,
-        user.squatPR,
-        user.benchPR,
-        user.deadliftPR,
-        diffDays,
-        1 if user.equipment == 'Equipped' else 0,
-        age,
-        user.weight
-    ]])
-
-    score_pred = score_model.predict(score_input_scaled)
-
-    rank_scaler = pickle.load(open("rank_scaler.pkl", "rb"))
-    rank_model_params = pickle.load(open("rank_model.pkl", "rb"))
-
-    W = rank_model_params['W']
-    b = rank_model_params['b']
-    beta = rank_model_params['beta']
-
-    def rc_elm_predict(X, W, b, beta):
-        H = np.tanh(np.dot(X, W.T) + b)
-        return np.dot(H, beta)
-
-    rank_input_scaled = rank_scaler.transform([[
-        0 if user.gender == 'Male' else 1,
-        0 if event_id == 2 else 1,
-        2 if event_id in [4, 5] else 0 if age <= 19 else 1,
-        user.weight,
-        score_pred[0][0],
-        score_pred[0][1],
-        score_pred[0][2]
-    ]])
-
-    rank_pred = rc_elm_predict(rank_input_scaled, W, b, beta)
-
-    rank_score = f"{round(int(rank_pred[0][0]))}"
-    default_squat_weight = str(int(round(score_pred[0][0] / 5)) * 5)
-    default_bench_weight = str(int(round(score_pred[0][1] / 5)) * 5)
-    default_deadlift_weight = str(int(round(score_pred[0][2] / 5)) * 5)
-
-    return jsonify({
-        'rank_score': rank_score,
-        'default_squat_weight': default_squat_weight,
-        'default_bench_weight': default_bench_weight,
-        'default_deadlift_weight': default_deadlift_weight
-    })
+    return jsonify(predict_rank_scores([(user, event_id, event_date)])[0])
+
+# Batched variant of /get_rank_score: one feature matrix and one pass of each model
+# for many lifters and/or events, e.g. {"items": [{"user_id": 3, "event_id": 2, "event_date": "12 Mar"}]}
+@app.route('/get_rank_scores', methods=['POST'])
+def get_rank_scores():
+    data = request.get_json()
+    items = data.get('items', [])
+
+    if not items:
+        return jsonify({'error': 'No items provided'}), 400
+
+    user_ids = {item.get('user_id', currUserId) for item in items}
+    users = {user.id: user for user in User.query.filter(User.id.in_(user_ids)).all()}
+
+    missing = [user_id for user_id in user_ids if user_id not in users]
+    if missing:
+        return jsonify({'error': f'User not found: {missing}'}), 404
+
+    results = predict_rank_scores([
+        (users[item.get('user_id', currUserId)], item.get('event_id'), item.get('event_date'))
+        for item in items
+    ])
+
+    for item, result in zip(items, results):
+        result['user_id'] = item.get('user_id', currUserId)
+        result['event_id'] = item.get('event_id')
+        result['event_date'] = item.get('event_date')
+
+    return jsonify({'results': results}), 200
+
+@app.route('/model_status', methods=['GET'])
+def model_status():
+    return jsonify(model_registry.status()), 200
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    return jsonify(prediction_cache.stats()), 200
 
 # Athlete stats
 athlete_stats = {
@@ -302,15 +290,7 @@ def update_factor_q_learning(exercise, initial_factor, best_value, target_value,
 
     return round(factor, 2)
 
-# Calculate factors for all exercises
 exercise_factors = {}
-for exercise in exercise_to_stat_map:
-    initial_factor = 0.5
-    best_value = athlete_stats[exercise_to_stat_map[exercise]]
-    target_value = athlete_stats[exercise_to_stat_map[exercise].replace("best", "target")]
-    exercise_factors[exercise] = update_factor_q_learning(
-        exercise, initial_factor, best_value, target_value, athlete_stats["duration"]
-    )
 
 # Workout schedule
 workout_schedule = {
@@ -325,13 +305,23 @@ workout_schedule = {
 
 updated_params = {}
 
-for exercise in exercise_to_stat_map:
-    updated_params[exercise] = {
-        "exercise": exercise,
-        "weight": int(athlete_stats[exercise_to_stat_map[exercise]] * exercise_factors[exercise]),
-        "sets": 4,
-        "reps": 8 if "deadlift" not in exercise else 6,
-    }
+# Calculate factors and starting parameters for all exercises
+def init_workout_plan():
+    for exercise in exercise_to_stat_map:
+        initial_factor = 0.5
+        best_value = athlete_stats[exercise_to_stat_map[exercise]]
+        target_value = athlete_stats[exercise_to_stat_map[exercise].replace("best", "target")]
+        exercise_factors[exercise] = update_factor_q_learning(
+            exercise, initial_factor, best_value, target_value, athlete_stats["duration"]
+        )
+
+    for exercise in exercise_to_stat_map:
+        updated_params[exercise] = {
+            "exercise": exercise,
+            "weight": int(athlete_stats[exercise_to_stat_map[exercise]] * exercise_factors[exercise]),
+            "sets": 4,
+            "reps": 8 if "deadlift" not in exercise else 6,
+        }
 
 def generate_workout(day):
     if workout_schedule[day] == "Rest":
@@ -410,27 +400,41 @@ def check_workout():
         return jsonify({"completed": True}), 200
     return jsonify({"completed": False}), 200
 
-with app.app_context():
-    db.create_all()
-
 # Load API key for Groq LLM
-load_dotenv()
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-
-if not GROQ_API_KEY:
-    raise ValueError("GROQ_API_KEY is not set. Check your environment variables or .env file.")
-
-# Initialize LLM
-llm = ChatGroq(
-    model="llama-3.3-70b-versatile",
-    api_key=GROQ_API_KEY,
-    temperature=0,
-    streaming=True
-)
-
-# Load saved ChromaDB embeddings
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2")
-vector_store = Chroma(persist_directory="./chroma_db", embedding_function=embeddings)
+def groq_api_key():
+    load_dotenv()
+    GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+
+    if not GROQ_API_KEY:
+        raise ValueError("GROQ_API_KEY is not set. Check your environment variables or .env file.")
+    return GROQ_API_KEY
+
+# The Groq LLM and the ChromaDB store behind /chat. The embedding model is large,
+# so they are built by the first /chat, once per process.
+llm = None
+vector_store = None
+_chat_lock = threading.Lock()
+
+def init_chat():
+    global llm, vector_store
+    with _chat_lock:
+        if llm is not None and vector_store is not None:
+            return
+        from langchain_chroma import Chroma
+        from langchain_groq import ChatGroq
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        # Initialize LLM
+        llm = ChatGroq(
+            model="llama-3.3-70b-versatile",
+            api_key=groq_api_key(),
+            temperature=0,
+            streaming=True
+        )
+
+        # Load saved ChromaDB embeddings
+        embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2")
+        vector_store = Chroma(persist_directory="./chroma_db", embedding_function=embeddings)
 
 # API endpoint to handle user queries
 @app.route("/chat", methods=["POST"])
@@ -442,6 +446,8 @@ def chat():
     if not user_question:
         return jsonify({"error": "Question is required"}), 400
 
+    init_chat()
+
     # Perform similarity search
     retrieved_docs = vector_store.similarity_search(user_question, k=3)
     context = "\n".join([doc.page_content for doc in retrieved_docs])
@@ -461,168 +467,193 @@ def chat():
     response = llm.invoke(prompt).content
     return jsonify({"response": response})
 
-class SquatPhase(Enum):
-    START = 1
-    DESCENT = 2
-    BOTTOM = 3
-    ASCENT = 4
-    END = 5
-
-def calculate_angle(a, b, c):
-    ba = np.array(a) - np.array(b)
-    bc = np.array(c) - np.array(b)
-    cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
-    angle = np.arccos(cosine_angle)
-    return np.degrees(angle)
-
+# Pose estimation runs on every frame ('all'), at ANALYSIS_TARGET_FPS ('fixed'), or
+# densely only around fast motion and phase transitions ('adaptive')
+ANALYSIS_SAMPLING = os.getenv("ANALYSIS_SAMPLING", "fixed")
+ANALYSIS_TARGET_FPS = float(os.getenv("ANALYSIS_TARGET_FPS", 30))
+# Longest side, in pixels, of the frames handed to pose estimation (0 = full resolution);
+# phone uploads are downscaled for inference and still rendered at full size
+ANALYSIS_INFERENCE_SIZE = int(os.getenv("ANALYSIS_INFERENCE_SIZE", 640))
+# Long videos can be split into this many time segments whose pose extraction runs
+# in parallel worker processes (1 = one process walks every frame)
+ANALYSIS_SEGMENTS = int(os.getenv("ANALYSIS_SEGMENTS", 1))
+# Temporal landmark filter between pose estimation and the phase logic ('none' or
+# 'one_euro'); turn it on when running the lite model (POSE_MODEL_COMPLEXITY=0)
+ANALYSIS_SMOOTHING = os.getenv("ANALYSIS_SMOOTHING", "none")
+
+@app.errorhandler(PosePoolTimeout)
+def pose_pool_timeout(e):
+    return jsonify({'error': str(e)}), 503
+
+@app.route('/pose_pool_stats', methods=['GET'])
+def pose_pool_stats():
+    return jsonify(pose_pool.stats()), 200
+
+@app.route('/landmark_cache_stats', methods=['GET'])
+def landmark_cache_stats():
+    return jsonify(landmark_cache.stats()), 200
+
+@app.route('/analysis_profile_stats', methods=['GET'])
+def analysis_profile_stats():
+    return jsonify(analysis_profiles.stats()), 200
+
+# Number from an /analyze form field, or default when the field is absent
+def form_number(name, default, cast):
+    value = request.form.get(name)
+    if value is None:
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        raise ValueError(f"{name} must be {'an integer' if cast is int else 'a number'}") from None
+
+# Pose and sampling settings of an /analyze or /analyze/jobs upload. Raises
+# ValueError, answered with a 400, for values the analysis can't run with.
+def analysis_settings():
+    settings = {
+        'sampling': request.form.get('sampling', ANALYSIS_SAMPLING),
+        'target_fps': form_number('target_fps', ANALYSIS_TARGET_FPS, float),
+        'inference_size': form_number('inference_size', ANALYSIS_INFERENCE_SIZE, int),
+        'segments': form_number('segments', ANALYSIS_SEGMENTS, int),
+        'smoothing': request.form.get('smoothing', ANALYSIS_SMOOTHING),
+    }
+    if settings['sampling'] not in SAMPLING_MODES:
+        raise ValueError(f'sampling must be one of {list(SAMPLING_MODES)}')
+    if not (np.isfinite(settings['target_fps']) and settings['target_fps'] > 0):
+        raise ValueError('target_fps must be a positive number')
+    if settings['inference_size'] < 0:
+        raise ValueError('inference_size must be 0 (full resolution) or a positive size')
+    if settings['segments'] < 1:
+        raise ValueError('segments must be at least 1')
+    if settings['smoothing'] not in SMOOTHING_MODES:
+        raise ValueError(f'smoothing must be one of {list(SMOOTHING_MODES)}')
+    return settings
+
+# Every /analyze request is profiled: upload, analysis and output time, per-frame
+# pipeline stages, frames without a pose and memory. The profile comes back under
+# 'profile' in JSON responses and in the X-Analysis-Profile header with a video,
+# and feeds the histograms at /analysis_profile_stats (see analysis_profile.py)
 @app.route('/analyze', methods=['POST'])
 def analyze_squat():
+    with RequestProfile() as profile:
+        return _analyze_squat(profile)
+
+def _analyze_squat(profile):
+    # The upload is streamed into this request's own scratch directory, which is
+    # removed when the request ends, so concurrent requests never clash. Reading
+    # request.files is what receives and parses it.
+    with profile.stage('upload'):
+        if 'video' not in request.files:
+            return jsonify({'error': 'No video file provided'}), 400
+        video_file = request.files['video']
+        input_video_path = save_upload(video_file, "uploaded_video.mp4")
+    output_video_path = os.path.join(request_scratch_dir(), "analyzed_video.mp4")
+
+    # output=video returns the annotated mp4 and output=compact a downscaled, lower
+    # frame rate one; the JSON outputs (landmarks, overlay, thumbnails, combinable
+    # as e.g. overlay,thumbnails) skip drawing and re-encoding and return the
+    # verdict with the parts asked for (see analysis_outputs.py)
+    output = request.form.get('output', 'video')
+    try:
+        outputs = parse_outputs(output)
+        settings = analysis_settings()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Re-uploads of the same clip with the same pose settings skip pose estimation
+    try:
+        with profile.stage('analyze'):
+            result = analyze_video_cached(pose_pool, landmark_cache, input_video_path,
+                                          output_video_path if video_output(outputs) else None,
+                                          progress=profile.sample_memory, **settings,
+                                          **render_options(video_output(outputs)))
+    except VideoAnalysisError as e:
+        return jsonify({'error': str(e)}), 500
+
+    if not video_output(outputs):
+        with profile.stage('outputs'):
+            add_outputs(result, outputs, input_video_path)
+        result['profile'] = profile.finish(result)
+        analysis_profiles.record(result['profile'])
+        return jsonify(result_to_json(result, include_landmarks='landmarks' in outputs)), 200
+
+    # Return the processed video file
+    response = send_scratch_file(output_video_path, as_attachment=True)
+    profile_data = profile.finish(result)
+    analysis_profiles.record(profile_data)
+    response.headers['X-Analysis-Profile'] = json.dumps(profile_data)
+    return response
+
+# Asynchronous variant of /analyze: the upload returns a job id straight away and
+# the analysis runs on a separate process pool
+@app.route('/analyze/jobs', methods=['POST'])
+def submit_analysis_job():
     if 'video' not in request.files:
         return jsonify({'error': 'No video file provided'}), 400
 
-    # Save the uploaded video file
-    video_file = request.files['video']
-    #input_video_path = "uploaded_video.mp4"
-    #output_video_path = "analyzed_video.mp4"
-    input_video_path = os.path.join(os.getcwd(), "uploaded_video.mp4")
-    output_video_path = os.path.join(os.getcwd(), "analyzed_video.mp4")
-    video_file.save(input_video_path)
-
-    # Initialize Mediapipe Pose model
-    mp_pose = mp.solutions.pose
-    pose = mp_pose.Pose()
-    essential_landmarks = {
-    'left_shoulder': mp_pose.PoseLandmark.LEFT_SHOULDER,
-    'right_shoulder': mp_pose.PoseLandmark.RIGHT_SHOULDER,
-    'left_hip': mp_pose.PoseLandmark.LEFT_HIP,
-    'right_hip': mp_pose.PoseLandmark.RIGHT_HIP,
-    'left_knee': mp_pose.PoseLandmark.LEFT_KNEE,
-    'right_knee': mp_pose.PoseLandmark.RIGHT_KNEE,
-    'left_ankle': mp_pose.PoseLandmark.LEFT_ANKLE,
-    'right_ankle': mp_pose.PoseLandmark.RIGHT_ANKLE
-    }
-    cap = cv2.VideoCapture(input_video_path)
-    if not cap.isOpened():
-        return jsonify({'error': 'Failed to process the video'}), 500
-    frame_rate = cap.get(cv2.CAP_PROP_FPS)
-    if frame_rate == 0 or frame_rate is None:
-        frame_rate = 30  # Default to 30 FPS
-
-    frame_interval = max(1, int(frame_rate // 30))  # Ensure it's at least 1
-    frame_count = 0
-    paused = False
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    out = cv2.VideoWriter(output_video_path, fourcc, frame_rate, (frame_width, frame_height))
-    
-    currSquatPhase = SquatPhase.START
-    print('START')
-    topSquatPosition = None
-    bottomSquatPosition = None
-    lowestKneeAngle = None
-
-    knee_angles = []
-    phase_frames = [0]
-    feedback = ""
-    skeletal_color = (0, 255, 0)
-    while cap.isOpened():
-        if not paused:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            result = pose.process(img_rgb)
-
-            if result.pose_landmarks:
-                points = {}
-                for name, landmark_id in essential_landmarks.items():
-                    landmark = result.pose_landmarks.landmark[landmark_id]
-                    x, y = int(landmark.x * frame.shape[1]), int(landmark.y * frame.shape[0])
-                    points[name] = (x, y)
-                    cv2.circle(frame, (x, y), 5, (255, 0, 0), -1)
-
-                if topSquatPosition is None:
-                    topSquatPosition = points['left_shoulder'][1]
-                    phase_frames.append(frame_count)
-                    print(f'START phase at frame 0 ({topSquatPosition = })')
-
-                if currSquatPhase == SquatPhase.START and points['left_shoulder'][1] > topSquatPosition * 1.05:
-                    currSquatPhase = SquatPhase.DESCENT
-                    phase_frames.append(frame_count)
-                    print(f'DESCENT phase at frame {frame_count}')
-
-                kneeAngle = calculate_angle(points['left_hip'], points['left_knee'], points['left_ankle'])
-
-                if currSquatPhase == SquatPhase.DESCENT:
-                    kneeAngle = calculate_angle(points['left_hip'], points['left_knee'], points['left_ankle'])
-
-                    # Check if squat reaches sufficient depth
-                    if kneeAngle < 95 and bottomSquatPosition is None:
-                        currSquatPhase = SquatPhase.BOTTOM
-                        phase_frames.append(frame_count)
-                        bottomSquatPosition = points['left_shoulder'][1]
-                        lowestKneeAngle = kneeAngle
-                        print(f'BOTTOM phase at frame {frame_count} ({bottomSquatPosition = })')
-
-                        # Squat is proper
-                        feedback = "Good squat depth!"
-                        skeletal_color = (0, 255, 0)  # Green for correct squat
-                    elif frame_count - phase_frames[-1] > frame_rate:  # Timeout if depth not reached
-                        feedback = "Squat depth insufficient!"
-                        skeletal_color = (0, 0, 255)  # Red for incorrect squat
-                        currSquatPhase = SquatPhase.BOTTOM
-
-                        # Capture the current frame
-                        improper_frame = frame.copy()
-
-                        # Highlight skeletal structure in red
-                        cv2.line(improper_frame, points['left_shoulder'], points['left_hip'], skeletal_color, 2)
-                        cv2.line(improper_frame, points['left_hip'], points['left_knee'], skeletal_color, 2)
-                        cv2.line(improper_frame, points['left_knee'], points['left_ankle'], skeletal_color, 2)
-
-                        cv2.line(improper_frame, points['right_shoulder'], points['right_hip'], skeletal_color, 2)
-                        cv2.line(improper_frame, points['right_hip'], points['right_knee'], skeletal_color, 2)
-                        cv2.line(improper_frame, points['right_knee'], points['right_ankle'], skeletal_color, 2)
-
-                        # Overlay feedback text
-                        cv2.putText(improper_frame, feedback, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, skeletal_color, 2, cv2.LINE_AA)
-
-                        print(f'IMPROPER SQUAT: Depth not reached at frame {frame_count}')
-                        #break
-
-                if currSquatPhase == SquatPhase.BOTTOM and kneeAngle > 90:
-                    currSquatPhase = SquatPhase.ASCENT
-                    phase_frames.append(frame_count)
-                    print(f'ASCENT phase at frame {frame_count}')
-
-                if currSquatPhase == SquatPhase.ASCENT and kneeAngle > 170:
-                    currSquatPhase = SquatPhase.END
-                    phase_frames.append(frame_count)
-                    print(f'END phase at frame {frame_count}')
-
-                knee_angles.append(kneeAngle)
-                cv2.line(frame, points['left_shoulder'], points['left_hip'], skeletal_color, 2)
-                cv2.line(frame, points['left_hip'], points['left_knee'], skeletal_color, 2)
-                cv2.line(frame, points['left_knee'], points['left_ankle'], skeletal_color, 2)
-
-                cv2.line(frame, points['right_shoulder'], points['right_hip'], skeletal_color, 2)
-                cv2.line(frame, points['right_hip'], points['right_knee'], skeletal_color, 2)
-                cv2.line(frame, points['right_knee'], points['right_ankle'], skeletal_color, 2)
-                cv2.putText(frame, feedback, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, skeletal_color, 2, cv2.LINE_AA)
-                
-            
-            frame_count += 1
-            out.write(frame)
-
-    cap.release()
-    out.release()
-    cv2.destroyAllWindows()
-
-    print("heyyyyyy")
+    output = request.form.get('output', 'video')
+    try:
+        outputs = parse_outputs(output)
+        settings = analysis_settings()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    # Return the processed video file
-    return send_file(output_video_path, as_attachment=True)
+    input_video_path = save_upload(request.files['video'], "uploaded_video.mp4")
+    try:
+        job_id = analysis_jobs.submit(input_video_path, settings, outputs=outputs)
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 429
+
+    return jsonify({'job_id': job_id, 'status_url': f'/analyze/jobs/{job_id}',
+                    'result_url': f'/analyze/jobs/{job_id}/result'}), 202
+
+@app.route('/analyze/jobs/<job_id>', methods=['GET'])
+def analysis_job_status(job_id):
+    status = analysis_jobs.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(status), 200
+
+@app.route('/analyze/jobs/<job_id>/result', methods=['GET'])
+def analysis_job_result(job_id):
+    status = analysis_jobs.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    if status['status'] != 'done':
+        return jsonify({'error': f"Job is {status['status']}", 'status': status['status']}), 409
+
+    result_path = analysis_jobs.result_path(job_id)
+    if result_path is None:
+        return jsonify(result_to_json(analysis_jobs.result(job_id),
+                                      include_landmarks='landmarks' in status['outputs'])), 200
+    return send_file(result_path, as_attachment=True)
+
+@app.route('/analyze/jobs', methods=['GET'])
+def analysis_jobs_stats():
+    return jsonify(analysis_jobs.stats()), 200
+
+# Startup work: tables, models, the Groq API key check, the workout plan and the
+# pose estimators. It runs on import, so under python server.py, flask run or a
+# WSGI server alike, except in the analysis and segment workers: they are spawned
+# processes that re-import this script as __mp_main__ and only need the analysis
+# code.
+def init_app():
+    with app.app_context():
+        db.create_all()
+
+    # Load the rank/score models once per worker instead of on every request
+    model_registry.load_all()
+
+    groq_api_key()
+    init_workout_plan()
+
+    # Build the pose estimators at startup rather than on the first uploads
+    if os.getenv("POSE_POOL_WARMUP", "1") == "1":
+        pose_pool.warm_up()
+
+if __name__ != '__mp_main__':
+    init_app()
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
@@ -0,0 +1,145 @@
+from enum import Enum
+
+import numpy as np
+
+from landmarks import JOINT_INDEX, LandmarkSeries, knee_angles
+
+SHOULDER, HIP, KNEE, ANKLE = (JOINT_INDEX['left_shoulder'], JOINT_INDEX['left_hip'],
+                              JOINT_INDEX['left_knee'], JOINT_INDEX['left_ankle'])
+
+GOOD_DEPTH_FEEDBACK = "Good squat depth!"
+INSUFFICIENT_DEPTH_FEEDBACK = "Squat depth insufficient!"
+HIP_ABOVE_KNEE_FEEDBACK = "Hip did not descend below the knee!"
+
+
+class SquatPhase(Enum):
+    START = 1
+    DESCENT = 2
+    BOTTOM = 3
+    ASCENT = 4
+    END = 5
+
+
+def calculate_angle(a, b, c):
+    ba = np.array(a) - np.array(b)
+    bc = np.array(c) - np.array(b)
+    cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
+    angle = np.arccos(cosine_angle)
+    return np.degrees(angle)
+
+
+# START -> DESCENT -> BOTTOM -> ASCENT -> END state machine for a single rep. It is
+# fed one frame at a time with a (joints, 2) row of integer pixel landmarks in
+# landmarks.JOINT_NAMES order and has no OpenCV or MediaPipe dependency, so it runs
+# the same on live video, uploaded clips and recorded landmark files.
+#
+# require_hip_below_knee gives the stricter variant from models/posture/nev1.py:
+# depth only counts once the hip is below the knee, and the descent times out
+# with HIP_ABOVE_KNEE_FEEDBACK while it isn't.
+class SquatAnalyzer:
+    def __init__(self, frame_rate, descent_shoulder_drop=1.05, bottom_knee_angle=95, ascent_knee_angle=90,
+                 end_knee_angle=170, require_hip_below_knee=False, verbose=False):
+        self.frame_rate = frame_rate
+        self.descent_shoulder_drop = descent_shoulder_drop
+        self.bottom_knee_angle = bottom_knee_angle
+        self.ascent_knee_angle = ascent_knee_angle
+        self.end_knee_angle = end_knee_angle
+        self.require_hip_below_knee = require_hip_below_knee
+        self.verbose = verbose
+
+        self.phase = SquatPhase.START
+        self.top_position = None
+        self.bottom_position = None
+        self.lowest_knee_angle = None
+        self.depth_ok = None
+        self.phase_frames = [0]
+        self.feedback = ""
+        self._log('START')
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+
+    def _enter(self, phase, frame_index, events):
+        self.phase = phase
+        self.phase_frames.append(frame_index)
+        events.append(phase)
+
+    # Advances the state machine by one frame and returns the phases entered on it
+    def update(self, frame_index, landmarks, knee_angle=None):
+        shoulder_y = landmarks[SHOULDER][1]
+        if knee_angle is None:
+            knee_angle = calculate_angle(landmarks[HIP], landmarks[KNEE], landmarks[ANKLE])
+        events = []
+
+        if self.top_position is None:
+            self.top_position = shoulder_y
+            self.phase_frames.append(frame_index)
+            self._log(f'START phase at frame 0 ({self.top_position = })')
+
+        if self.phase == SquatPhase.START and shoulder_y > self.top_position * self.descent_shoulder_drop:
+            self._enter(SquatPhase.DESCENT, frame_index, events)
+            self._log(f'DESCENT phase at frame {frame_index}')
+
+        if self.phase == SquatPhase.DESCENT:
+            hip_below_knee = landmarks[HIP][1] > landmarks[KNEE][1]
+            timed_out = frame_index - self.phase_frames[-1] > self.frame_rate
+
+            if self.require_hip_below_knee:
+                # Check if squat reaches sufficient depth
+                if hip_below_knee:
+                    if knee_angle < self.bottom_knee_angle and self.bottom_position is None:
+                        self._reach_bottom(frame_index, shoulder_y, knee_angle, events)
+                elif timed_out:
+                    self._miss_depth(frame_index, HIP_ABOVE_KNEE_FEEDBACK)
+            elif knee_angle < self.bottom_knee_angle and self.bottom_position is None:
+                self._reach_bottom(frame_index, shoulder_y, knee_angle, events)
+            elif timed_out:  # Timeout if depth not reached
+                self._miss_depth(frame_index, INSUFFICIENT_DEPTH_FEEDBACK)
+
+        if self.phase == SquatPhase.BOTTOM and knee_angle > self.ascent_knee_angle:
+            self._enter(SquatPhase.ASCENT, frame_index, events)
+            self._log(f'ASCENT phase at frame {frame_index}')
+
+        if self.phase == SquatPhase.ASCENT and knee_angle > self.end_knee_angle:
+            self._enter(SquatPhase.END, frame_index, events)
+            self._log(f'END phase at frame {frame_index}')
+
+        return events
+
+    def _reach_bottom(self, frame_index, shoulder_y, knee_angle, events):
+        self._enter(SquatPhase.BOTTOM, frame_index, events)
+        self.bottom_position = shoulder_y
+        self.lowest_knee_angle = knee_angle
+        self.depth_ok = True
+        self.feedback = GOOD_DEPTH_FEEDBACK
+        self._log(f'BOTTOM phase at frame {frame_index} ({self.bottom_position = })')
+
+    def _miss_depth(self, frame_index, feedback):
+        # The rep still moves on to BOTTOM so the ascent is tracked, but no phase frame is recorded
+        self.phase = SquatPhase.BOTTOM
+        self.depth_ok = False
+        self.feedback = feedback
+        self._log(f'IMPROPER SQUAT: {feedback} at frame {frame_index}')
+
+    @property
+    def skeletal_color(self):
+        # BGR: red for an incorrect squat, green otherwise
+        return (0, 0, 255) if self.depth_ok is False else (0, 255, 0)
+
+    # Replays a whole LandmarkSeries (pixel coordinates) through the state machine.
+    # Knee angles are computed for the clip in one vectorized pass, and frames
+    # without a pose are skipped as they are on live video.
+    def run(self, series):
+        points = np.trunc(series.points)
+        angles = knee_angles(LandmarkSeries(points, series.frame_rate))
+        for frame_index in np.flatnonzero(series.valid).tolist():
+            self.update(frame_index, points[frame_index], float(angles[frame_index]))
+        return self
+
+    def result(self):
+        return {
+            'phase_frames': self.phase_frames,
+            'lowest_knee_angle': None if self.lowest_knee_angle is None else float(self.lowest_knee_angle),
+            'feedback': self.feedback,
+        }
@@ -0,0 +1,29 @@
+import json
+
+from live_feedback import LiveFeedback
+from pose_pool import PosePool
+
+
+# Stands in for a flask-sock connection: hands out the queued messages, then None
+# as on the idle timeout, and keeps what the server sends back
+class FakeWebSocket:
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.sent = []
+
+    def receive(self, timeout=None):
+        return self.messages.pop(0) if self.messages else None
+
+    def send(self, data):
+        self.sent.append(json.loads(data))
+
+
+def test_non_object_messages_are_protocol_errors():
+    feedback = LiveFeedback(pose_pool=PosePool(size=1))
+    ws = FakeWebSocket(['[1, 2]', '"start"', '42', 'null', json.dumps({'type': 'stop'})])
+    feedback.handle(ws)
+
+    assert ws.sent[:4] == [{'type': 'error', 'error': 'expected a JSON object'}] * 4
+    assert ws.sent[4]['type'] == 'summary'
+    assert feedback.errors == 4
+    assert feedback.active == 0
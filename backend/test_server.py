@@ -0,0 +1,75 @@
+import importlib
+import os
+import subprocess
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LIFTER = {
+    'name': 'Test Lifter', 'email': 'lifter@example.com', 'password': 'secret', 'dob': '1998-04-02',
+    'height': 178, 'weight': 82.5, 'squatPR': 180, 'benchPR': 120, 'deadliftPR': 220, 'gender': 'male',
+    'experienceLevel': 'intermediate', 'equipment': 'raw',
+}
+
+
+# server imported the way flask run and WSGI servers import it, not as __main__,
+# against a throwaway database
+@pytest.fixture(scope='module')
+def server(tmp_path_factory):
+    env = pytest.MonkeyPatch()
+    env.chdir(BACKEND_DIR)
+    env.setenv('DATABASE_URL', f"sqlite:///{tmp_path_factory.mktemp('db') / 'users.db'}")
+    env.setenv('POSE_POOL_WARMUP', '0')
+    env.setenv('GROQ_API_KEY', 'test')
+    sys.modules.pop('server', None)
+    yield importlib.import_module('server')
+    sys.modules.pop('server', None)
+    env.undo()
+
+
+def test_workout_after_import(server):
+    client = server.app.test_client()
+    assert client.post('/register', json=LIFTER).status_code == 201
+    assert client.post('/login', json={'email': LIFTER['email'], 'password': LIFTER['password']}).status_code == 200
+
+    response = client.get('/workout')
+    assert response.status_code == 200
+    assert response.get_json()['Monday']
+
+
+def test_chat_after_import(server, monkeypatch):
+    # The Groq LLM and the Chroma store are external; stand in for what init_chat builds
+    class Doc:
+        page_content = 'Brace before you descend.'
+
+    class Store:
+        def similarity_search(self, question, k):
+            return [Doc()] * k
+
+    class Reply:
+        content = '- Brace before you descend.'
+
+    class LLM:
+        def invoke(self, prompt):
+            assert 'Brace before you descend.' in prompt
+            return Reply()
+
+    monkeypatch.setattr(server, 'llm', LLM())
+    monkeypatch.setattr(server, 'vector_store', Store())
+
+    response = server.app.test_client().post('/chat', json={'question': 'How do I squat deeper?'})
+    assert response.status_code == 200
+    assert response.get_json() == {'response': '- Brace before you descend.'}
+
+
+# Spawned analysis workers re-import server.py as __mp_main__ and skip the startup work
+def test_spawned_worker_skips_startup(tmp_path):
+    code = ("import runpy; s = runpy.run_path('server.py', run_name='__mp_main__'); "
+            "print(len(s['exercise_factors']), any(m['loaded'] for m in s['model_registry'].status().values()))")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'users.db'}", GROQ_API_KEY='')
+    output = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+                            check=True).stdout
+    assert output.split()[-2:] == ['0', 'False']
+    assert not (tmp_path / 'users.db').exists()
@@ -0,0 +1,396 @@
+import os
+import time
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from landmark_filter import make_filter
+from landmarks import JOINT_NAMES, LandmarkSeries, knee_angles
+from rep_segmentation import segment_reps
+from squat_analyzer import ANKLE, HIP, KNEE, SquatAnalyzer, calculate_angle
+from video_pipeline import Sink, StageStats, prefetch, timed
+
+mp_pose = mp.solutions.pose
+
+essential_landmarks = {name: mp_pose.PoseLandmark[name.upper()] for name in JOINT_NAMES}
+LANDMARK_NAMES = JOINT_NAMES
+
+# Knee angle thresholds the phase logic switches on; adaptive sampling goes dense near them
+PHASE_KNEE_ANGLES = (90, 95, 170)
+
+SAMPLING_MODES = ('all', 'fixed', 'adaptive')
+
+PROGRESS_INTERVAL = 10
+
+# Decode, pose inference and encoding each run on their own thread (see video_pipeline.py)
+ANALYSIS_PIPELINE = os.getenv("ANALYSIS_PIPELINE", "1") == "1"
+STAGES = ('decode', 'infer', 'render', 'encode')
+# infer split into the color conversion (and downscale) and pose.process itself
+INFER_STEPS = ('convert', 'pose')
+
+
+class VideoAnalysisError(Exception):
+    pass
+
+
+# Frame downscaled so its longer side is at most inference_size pixels (None or 0
+# leaves it alone). MediaPipe resizes to its own small input internally, so handing
+# it a 1080p or 4K frame mostly pays for a full-size color conversion and copy.
+def inference_frame(frame, inference_size):
+    height, width = frame.shape[:2]
+    if not inference_size or max(height, width) <= inference_size:
+        return frame
+    scale = inference_size / max(height, width)
+    # INTER_AREA looks marginally better but costs more than the whole pose pass at 4K
+    return cv2.resize(frame, (max(1, round(width * scale)), max(1, round(height * scale))),
+                      interpolation=cv2.INTER_LINEAR)
+
+
+# Pixel coordinates of the essential landmarks as a (joints, 2) array, or None.
+# Pose estimation runs at inference_size, but MediaPipe's landmarks are normalized
+# to the image, so scaling them by the original frame size maps them back to full
+# resolution for drawing and angle math. stages, if given, collects the time spent
+# in the conversion and in pose.process under 'convert' and 'pose'.
+def detect_landmarks(pose, frame, inference_size=None, stages=None):
+    start = time.perf_counter()
+    img_rgb = cv2.cvtColor(inference_frame(frame, inference_size), cv2.COLOR_BGR2RGB)
+    converted = time.perf_counter()
+    result = pose.process(img_rgb)
+    if stages is not None:
+        stages['convert'].add(converted - start)
+        stages['pose'].add(time.perf_counter() - converted)
+    if not result.pose_landmarks:
+        return None
+
+    landmark = result.pose_landmarks.landmark
+    height, width = frame.shape[:2]
+    return np.array([[landmark[landmark_id].x * width, landmark[landmark_id].y * height]
+                     for landmark_id in essential_landmarks.values()])
+
+
+def landmarks_to_points(landmarks):
+    return {name: (int(x), int(y)) for name, (x, y) in zip(LANDMARK_NAMES, landmarks)}
+
+
+# Decides which frames pose estimation runs on.
+#   all:      every frame
+#   fixed:    every round(frame_rate / target_fps) frames
+#   adaptive: starts dense, backs off towards the fixed interval while the lifter
+#             is still, and drops back to every frame on fast motion or when the
+#             knee angle is close to one of the phase thresholds
+class FrameSampler:
+    def __init__(self, frame_rate, mode='fixed', target_fps=30, motion_threshold=0.015, angle_margin=15):
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f'Unknown sampling mode {mode!r}, expected one of {SAMPLING_MODES}')
+        if not target_fps > 0:
+            raise ValueError(f'target_fps must be positive, got {target_fps!r}')
+
+        self.mode = mode
+        self.max_interval = 1 if mode == 'all' else max(1, int(round(frame_rate / target_fps)))
+        self.interval = 1 if mode == 'adaptive' else self.max_interval
+        self.motion_threshold = motion_threshold
+        self.angle_margin = angle_margin
+        self.next_keyframe = 0
+        self._last_index = None
+        self._last_landmarks = None
+
+    def is_keyframe(self, frame_index):
+        return frame_index >= self.next_keyframe
+
+    def update(self, frame_index, landmarks, frame_height):
+        if self.mode == 'adaptive':
+            self.interval = self._adaptive_interval(frame_index, landmarks, frame_height)
+        self.next_keyframe = frame_index + self.interval
+        self._last_index = frame_index
+        self._last_landmarks = landmarks
+
+    def _adaptive_interval(self, frame_index, landmarks, frame_height):
+        if landmarks is None or self._last_landmarks is None:
+            return 1
+
+        # Largest joint displacement per frame, relative to frame height
+        frames_elapsed = frame_index - self._last_index
+        motion = np.max(np.linalg.norm(landmarks - self._last_landmarks, axis=1)) / frames_elapsed / frame_height
+
+        knee_angle = calculate_angle(landmarks[HIP], landmarks[KNEE], landmarks[ANKLE])
+        near_threshold = any(abs(knee_angle - threshold) < self.angle_margin for threshold in PHASE_KNEE_ANGLES)
+
+        if motion > self.motion_threshold or near_threshold:
+            return 1
+        return min(self.interval * 2, self.max_interval)
+
+
+def interpolate_landmarks(start_index, start, end_index, end, frame_index):
+    if start is None or end is None:
+        return None
+    t = (frame_index - start_index) / (end_index - start_index)
+    return start + (end - start) * t
+
+
+def read_frames(cap):
+    while cap.isOpened():
+        ret, frame = cap.read()
+        if not ret:
+            break
+        yield frame
+
+
+# Yields (frame_index, frame, landmarks, is_keyframe) in order for the decoded
+# frames. Pose estimation only runs on the sampler's keyframes; frames in between
+# are held back until the next keyframe and get linearly interpolated landmarks, so
+# memory is bounded by the sampling interval. Frames after the last keyframe keep
+# its landmarks. landmark_filter, if given, smooths each keyframe's landmarks as
+# they come out of pose estimation, before the sampler and the phase logic see them.
+def iter_pose_frames(frames, pose, sampler, inference_size=None, landmark_filter=None, stages=None):
+    pending = []
+    last_index, last_landmarks = None, None
+
+    for frame_index, frame in enumerate(frames):
+        if sampler.is_keyframe(frame_index):
+            landmarks = detect_landmarks(pose, frame, inference_size, stages)
+            if landmarks is not None and landmark_filter is not None:
+                landmarks = landmark_filter(frame_index, landmarks, frame.shape[0])
+            sampler.update(frame_index, landmarks, frame.shape[0])
+
+            for pending_index, pending_frame in pending:
+                yield pending_index, pending_frame, interpolate_landmarks(
+                    last_index, last_landmarks, frame_index, landmarks, pending_index), False
+            pending = []
+
+            yield frame_index, frame, landmarks, True
+            last_index, last_landmarks = frame_index, landmarks
+        else:
+            pending.append((frame_index, frame))
+
+    for pending_index, pending_frame in pending:
+        yield pending_index, pending_frame, last_landmarks, False
+
+
+# JSON-friendly copy of an analyze_video result: landmarks become nested lists of
+# pixel coordinates rounded to 0.1 px, with null for frames without a pose
+def result_to_json(result, include_landmarks=True):
+    result = dict(result)
+    landmarks = result.pop('landmarks')
+    if include_landmarks:
+        result['landmark_names'] = LANDMARK_NAMES
+        result['landmarks'] = [None if np.isnan(frame).any() else np.round(frame, 1).tolist()
+                               for frame in landmarks]
+    result['knee_angles'] = [round(angle, 2) for angle in result['knee_angles']]
+    return result
+
+
+def draw_skeleton(frame, points, skeletal_color, thickness=2):
+    cv2.line(frame, points['left_shoulder'], points['left_hip'], skeletal_color, thickness)
+    cv2.line(frame, points['left_hip'], points['left_knee'], skeletal_color, thickness)
+    cv2.line(frame, points['left_knee'], points['left_ankle'], skeletal_color, thickness)
+
+    cv2.line(frame, points['right_shoulder'], points['right_hip'], skeletal_color, thickness)
+    cv2.line(frame, points['right_hip'], points['right_knee'], skeletal_color, thickness)
+    cv2.line(frame, points['right_knee'], points['right_ankle'], skeletal_color, thickness)
+
+
+# Joints, skeleton and feedback text on a frame. scale is the frame's size relative
+# to the one the landmarks were detected on, for downscaled renders and thumbnails.
+def draw_annotations(frame, landmarks, skeletal_color, feedback, scale=1.0):
+    points = landmarks_to_points(landmarks * scale)
+    thickness = max(1, round(2 * scale))
+    for x, y in points.values():
+        cv2.circle(frame, (x, y), max(2, round(5 * scale)), (255, 0, 0), -1)
+    draw_skeleton(frame, points, skeletal_color, thickness)
+    cv2.putText(frame, feedback, (round(10 * scale), round(30 * scale)), cv2.FONT_HERSHEY_SIMPLEX, scale,
+                skeletal_color, thickness, cv2.LINE_AA)
+
+
+# Replays cached landmarks (see landmark_cache.py) against the decoded frames in
+# the same (frame_index, frame, landmarks, is_keyframe) shape as iter_pose_frames
+def iter_cached_frames(frames, points):
+    for frame_index, frame in enumerate(frames):
+        landmarks = None
+        if frame_index < len(points) and not np.isnan(points[frame_index]).any():
+            landmarks = np.array(points[frame_index])
+        yield frame_index, frame, landmarks, False
+
+
+def analysis_result(series, frame_size, frames, pose_frames, sampling, analyzer, knee_angle_series, cached=False,
+                    stages=None):
+    return {
+        'frame_rate': series.frame_rate,
+        'frame_size': tuple(frame_size),
+        'landmarks': series.points,
+        'frames': frames,
+        'pose_frames': pose_frames,
+        'sampling': sampling,
+        'cached': cached,
+        'stages': stages,
+        'knee_angles': [float(angle) for angle in knee_angle_series],
+        **analyzer.result(),
+        # Every rep in the clip; phase_frames above only follow the first
+        'reps': segment_reps(series, analyzer.bottom_knee_angle, analyzer.require_hip_below_knee),
+    }
+
+
+# Runs squat analysis over a video and, unless output_video_path is None, writes the
+# annotated copy there. Returns the per-frame landmarks, phase frames, knee angle
+# series and depth feedback. With output_video_path=None nothing is drawn or encoded.
+# progress, if given, is called as progress(frames_processed, total_frames) every
+# PROGRESS_INTERVAL frames. analyzer_options are passed on to SquatAnalyzer.
+# inference_size caps the longer side of the frames pose estimation sees; the
+# annotated video is still drawn at full resolution. smoothing ('none' or
+# 'one_euro') filters landmark jitter before the phase logic, which the lighter
+# pose models need to avoid false transitions.
+#
+# render_size caps the longer side of the annotated video and render_fps its frame
+# rate (see analysis_outputs.py for the compact profile). Skipped frames are neither
+# drawn nor encoded; the phase logic still sees every frame at full resolution.
+#
+# cached is a landmark cache entry for this video; pose estimation is skipped and
+# pose may be None. Without an output video the video isn't even decoded.
+#
+# With pipelined=True decoding, pose inference and encoding each run on their own
+# thread, connected by bounded queues, while the phase logic and drawing stay on
+# the calling thread; every stage handles frames in order. Both modes report
+# per-stage counters under 'stages' to show which one limits throughput.
+def analyze_video(input_video_path, output_video_path, pose, sampling='fixed', target_fps=30, progress=None,
+                  analyzer_options=None, cached=None, inference_size=None, pipelined=ANALYSIS_PIPELINE,
+                  smoothing='none', render_size=None, render_fps=None):
+    analyzer_options = analyzer_options or {}
+    render = output_video_path is not None
+
+    if cached is not None and not render:
+        series = LandmarkSeries(cached['landmarks'], cached['frame_rate'])
+        analyzer = SquatAnalyzer(series.frame_rate, **analyzer_options).run(series)
+        knee_angle_series = knee_angles(LandmarkSeries(np.trunc(series.points)))[series.valid]
+        if progress is not None:
+            progress(len(series), len(series))
+        return analysis_result(series, cached['frame_size'], len(series), cached['pose_frames'], sampling,
+                               analyzer, knee_angle_series, cached=True)
+
+    cap = cv2.VideoCapture(input_video_path)
+    if not cap.isOpened():
+        raise VideoAnalysisError('Failed to process the video')
+    frame_rate = cap.get(cv2.CAP_PROP_FPS)
+    if frame_rate == 0 or frame_rate is None:
+        frame_rate = 30  # Default to 30 FPS
+
+    frames_read = 0
+    pose_frames = 0
+    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    if render:
+        render_stride = max(1, int(round(frame_rate / render_fps))) if render_fps else 1
+        render_scale = min(1.0, render_size / max(frame_width, frame_height)) if render_size else 1.0
+        render_dims = (max(1, round(frame_width * render_scale)), max(1, round(frame_height * render_scale)))
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        out = cv2.VideoWriter(output_video_path, fourcc, frame_rate / render_stride, render_dims)
+
+    stages = {name: StageStats(name) for name in STAGES + INFER_STEPS}
+    stage = prefetch if pipelined else timed
+    frames = stage(read_frames(cap), stages['decode'])
+    if cached is None:
+        frames = iter_pose_frames(frames, pose, FrameSampler(frame_rate, mode=sampling, target_fps=target_fps),
+                                  inference_size, make_filter(smoothing, frame_rate), stages)
+    else:
+        frames = iter_cached_frames(frames, cached['landmarks'])
+    frames = stage(frames, stages['infer'])
+    writer = Sink(out.write, stages['encode']) if render and pipelined else None
+
+    analyzer = SquatAnalyzer(frame_rate, **analyzer_options) if render else None
+    landmark_series = []
+    knee_angle_series = []
+    try:
+        for frame_count, frame, landmarks, is_keyframe in frames:
+            start = time.perf_counter()
+            frames_read += 1
+            pose_frames += is_keyframe
+            landmark_series.append(landmarks)
+
+            # Landmarks-only runs defer the phase logic to one vectorized pass at the end
+            if render and landmarks is not None:
+                pixels = np.trunc(landmarks)
+                kneeAngle = calculate_angle(pixels[HIP], pixels[KNEE], pixels[ANKLE])
+                analyzer.update(frame_count, pixels, kneeAngle)
+                knee_angle_series.append(kneeAngle)
+
+            if render and frame_count % render_stride == 0:
+                if render_scale < 1:
+                    frame = cv2.resize(frame, render_dims, interpolation=cv2.INTER_AREA)
+                if landmarks is not None:
+                    draw_annotations(frame, landmarks, analyzer.skeletal_color, analyzer.feedback, render_scale)
+                stages['render'].add(time.perf_counter() - start)
+
+                if writer is not None:
+                    writer.put(frame, stages['render'])
+                else:
+                    start = time.perf_counter()
+                    out.write(frame)
+                    stages['encode'].add(time.perf_counter() - start)
+            if progress is not None and frames_read % PROGRESS_INTERVAL == 0:
+                progress(frames_read, total_frames)
+    finally:
+        frames.close()
+        try:
+            if writer is not None:
+                writer.close()
+        finally:
+            cap.release()
+            if render:
+                out.release()
+
+    if progress is not None:
+        progress(frames_read, max(total_frames, frames_read))
+
+    if cached is not None:
+        pose_frames = cached['pose_frames']
+    series = LandmarkSeries.from_frames(landmark_series, frame_rate)
+    if not render:
+        analyzer = SquatAnalyzer(frame_rate, **analyzer_options).run(series)
+        knee_angle_series = knee_angles(LandmarkSeries(np.trunc(series.points)))[series.valid]
+
+    return analysis_result(series, (frame_width, frame_height), frames_read, pose_frames, sampling,
+                           analyzer, knee_angle_series, cached=cached is not None,
+                           stages={name: stats.to_dict() for name, stats in stages.items() if stats.items})
+
+
+# analyze_video with the landmark cache in front of pose estimation: on a hit no
+# estimator is checked out of pose_pool and only the phase logic (and rendering,
+# if asked for) runs; on a miss the extracted landmarks are stored for next time.
+# segments > 1 extracts landmarks for that many time segments in parallel worker
+# processes instead (see segment_analysis.py) and analyzes the stitched stream.
+def analyze_video_cached(pose_pool, landmark_cache, input_video_path, output_video_path, sampling='fixed',
+                         target_fps=30, inference_size=None, segments=1, smoothing='none', **kwargs):
+    if inference_size is not None and inference_size < 0:
+        raise ValueError(f'inference_size must be 0 (full resolution) or positive, got {inference_size!r}')
+    if segments < 1:
+        raise ValueError(f'segments must be at least 1, got {segments!r}')
+    cache_key = None
+    cached = None
+    if landmark_cache is not None and landmark_cache.enabled:
+        settings = {'sampling': sampling, 'target_fps': float(target_fps), 'inference_size': inference_size or None,
+                    'smoothing': smoothing, 'joints': LANDMARK_NAMES, **pose_pool.settings()}
+        cache_key = landmark_cache.key(input_video_path, settings)
+        cached = landmark_cache.get(cache_key)
+
+    if cached is not None:
+        return analyze_video(input_video_path, output_video_path, None, sampling=sampling, target_fps=target_fps,
+                             cached=cached, **kwargs)
+
+    if segments > 1:
+        from segment_analysis import segmented_extractor
+
+        extracted = segmented_extractor.extract(input_video_path, segments, sampling=sampling, target_fps=target_fps,
+                                                inference_size=inference_size, smoothing=smoothing)
+        result = analyze_video(input_video_path, output_video_path, None, sampling=sampling, target_fps=target_fps,
+                               cached=extracted, **kwargs)
+        result.update(cached=False, segments=extracted['segments'])
+    else:
+        with pose_pool.acquire() as pose:
+            result = analyze_video(input_video_path, output_video_path, pose, sampling=sampling,
+                                   target_fps=target_fps, inference_size=inference_size, smoothing=smoothing,
+                                   **kwargs)
+    if cache_key is not None:
+        landmark_cache.put(cache_key, result['landmarks'], frame_rate=result['frame_rate'],
+                           frame_size=result['frame_size'], pose_frames=result['pose_frames'])
+    return result
@@ -0,0 +1,189 @@
+import os
+import queue
+import threading
+import time
+
+PIPELINE_QUEUE_DEPTH = int(os.getenv("PIPELINE_QUEUE_DEPTH", 8))
+
+_DONE = object()
+
+# Seconds the current thread has spent waiting on an empty pipeline queue, so a
+# stage's own work can be told apart from time spent waiting for its input
+_waits = threading.local()
+
+
+def _waited():
+    return getattr(_waits, 'seconds', 0.0)
+
+
+def _get(q):
+    start = time.perf_counter()
+    item = q.get()
+    _waits.seconds = _waited() + time.perf_counter() - start
+    return item
+
+
+class _Failure:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+# Per-stage counters. busy is the stage's own work, starved the time it waited for
+# input and blocked the time it waited for room downstream. The stage with the
+# lowest fps (items / busy) is the bottleneck; the others end up starved or blocked.
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+
+    # Charges the time since start to the stage, minus any time spent on empty queues,
+    # and returns the stage's own share
+    def record(self, start, waited_before, items=1):
+        waited = _waited() - waited_before
+        busy = time.perf_counter() - start - waited
+        self.busy += busy
+        self.starved += waited
+        self.items += items
+        return busy
+
+    def add(self, seconds, items=1):
+        self.busy += seconds
+        self.items += items
+
+    def to_dict(self):
+        return {
+            'frames': self.items,
+            'busy_s': round(self.busy, 3),
+            'starved_s': round(self.starved, 3),
+            'blocked_s': round(self.blocked, 3),
+            'fps': round(self.items / self.busy, 1) if self.busy > 0 else None,
+        }
+
+
+# Pipeline threads are named '<stage>:<request thread>', so a profiler can attribute
+# them to the request (see analysis_profile.py). Stages started from another
+# stage's thread, as a lazily started prefetch is, carry over its request thread.
+def _start_thread(target, stats):
+    parent = threading.current_thread()
+    request_name = getattr(parent, 'request_name', parent.name)
+    thread = threading.Thread(target=target, name=f'{stats.name}:{request_name}', daemon=True)
+    thread.request_name = request_name
+    thread.start()
+    return thread
+
+
+def _put(q, item, stop, stats):
+    start = time.perf_counter()
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            break
+        except queue.Full:
+            continue
+    if stats is not None:
+        stats.blocked += time.perf_counter() - start
+
+
+# Serial counterpart of prefetch: same counters, no thread. Time spent here counts
+# as waiting for input for whichever timed stage wraps this one.
+def timed(iterable, stats):
+    iterator = iter(iterable)
+    try:
+        while True:
+            start, waited_before = time.perf_counter(), _waited()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            busy = stats.record(start, waited_before)
+            _waits.seconds = _waited() + busy
+            yield item
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            close()
+
+
+# Iterates iterable on its own thread, at most depth items ahead of the consumer.
+# Items come out in order, exceptions are re-raised in the consumer, and closing
+# the generator early stops the producer thread.
+def prefetch(iterable, stats, depth=PIPELINE_QUEUE_DEPTH):
+    q = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            while not stop.is_set():
+                start, waited_before = time.perf_counter(), _waited()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                stats.record(start, waited_before)
+                _put(q, item, stop, stats)
+        except BaseException as e:
+            _put(q, _Failure(e), stop, stats)
+            return
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+        _put(q, _DONE, stop, stats)
+
+    thread = _start_thread(produce, stats)
+    try:
+        while True:
+            item = _get(q)
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+# Calls fn(item) for every item put, in order, on its own thread with at most depth
+# items queued. close() waits for the queue to drain and re-raises any error.
+class Sink:
+    def __init__(self, fn, stats, depth=PIPELINE_QUEUE_DEPTH):
+        self.fn = fn
+        self.stats = stats
+        self._queue = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._error = None
+        self._thread = _start_thread(self._consume, stats)
+
+    def _consume(self):
+        while True:
+            waited_before = _waited()
+            item = _get(self._queue)
+            self.stats.starved += _waited() - waited_before
+            if item is _DONE:
+                return
+            start = time.perf_counter()
+            try:
+                self.fn(item)
+            except BaseException as e:
+                self._error = e
+                self._stop.set()
+                return
+            self.stats.busy += time.perf_counter() - start
+            self.stats.items += 1
+
+    # upstream_stats, if given, is charged for the time spent waiting for room
+    def put(self, item, upstream_stats=None):
+        if self._error is not None:
+            raise self._error
+        _put(self._queue, item, self._stop, upstream_stats)
+
+    def close(self):
+        _put(self._queue, _DONE, self._stop, None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+from landmarks import JOINT_NAMES, LandmarkSeries, hip_angles, knee_angles, sliding_windows, torso_angles
+from squat_analyzer import calculate_angle
+
+# Micro-benchmark: knee + hip angles computed per frame the way analyze_squat used
+# to (points dict rebuilt from tuples, calculate_angle per joint) against the
+# vectorized functions over a whole (frames, joints, 2) landmark array.
+
+
+def synthetic_series(n_frames, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(100, 600, (len(JOINT_NAMES), 2))
+    drift = np.cumsum(rng.normal(0, 1.5, (n_frames, len(JOINT_NAMES), 2)), axis=0)
+    return LandmarkSeries(base + drift)
+
+
+def per_frame(series):
+    knee, hip = [], []
+    for frame in series.points:
+        points = {name: (int(x), int(y)) for name, (x, y) in zip(JOINT_NAMES, frame)}
+        knee.append(calculate_angle(points['left_hip'], points['left_knee'], points['left_ankle']))
+        hip.append(calculate_angle(points['left_shoulder'], points['left_hip'], points['left_knee']))
+    return np.array(knee), np.array(hip)
+
+
+def vectorized(series):
+    return knee_angles(series), hip_angles(series)
+
+
+def best_of(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=10000)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--window', type=int, default=15)
+    args = parser.parse_args()
+
+    series = synthetic_series(args.frames)
+    pixels = LandmarkSeries(np.trunc(series.points))
+
+    per_frame_time, (knee_loop, hip_loop) = best_of(lambda: per_frame(series), args.repeats)
+    vector_time, (knee_vec, hip_vec) = best_of(lambda: vectorized(pixels), args.repeats)
+    torso_time, _ = best_of(lambda: torso_angles(pixels), args.repeats)
+    window_time, _ = best_of(lambda: sliding_windows(knee_vec, args.window).min(axis=1), args.repeats)
+
+    max_diff = max(np.nanmax(np.abs(knee_loop - knee_vec)), np.nanmax(np.abs(hip_loop - hip_vec)))
+    print(f'{args.frames} frames, knee + hip angles (best of {args.repeats})')
+    print(f'  per-frame calculate_angle: {per_frame_time * 1000:9.2f} ms  '
+          f'({args.frames / per_frame_time:,.0f} frames/s)')
+    print(f'  vectorized:                {vector_time * 1000:9.2f} ms  '
+          f'({args.frames / vector_time:,.0f} frames/s)  {per_frame_time / vector_time:.0f}x')
+    print(f'  + torso angles:            {torso_time * 1000:9.2f} ms')
+    print(f'  rolling {args.window}-frame knee min:  {window_time * 1000:9.2f} ms')
+    print(f'  max abs difference:        {max_diff:.2e} deg')
@@ -0,0 +1,104 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+from flask import Flask
+from simple_websocket import Client, ConnectionClosed
+from werkzeug.serving import make_server
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+from live_feedback import init_live_feedback, live_feedback
+
+LANDMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'landmarks')
+
+# Many simultaneous /live sessions against one threaded server process. Each client
+# streams a recorded clip's landmarks (see replay_landmarks.py) at --fps, or as fast
+# as the server answers with --fps 0, and checks the rep it gets back has the same
+# phase frames as the recording. Latency is measured from sending a frame to
+# receiving the transition it caused.
+
+
+def load_clips(paths):
+    clips = []
+    for path in paths:
+        with np.load(path) as data:
+            points = data['landmarks']
+            clips.append(([None if np.isnan(frame).any() else frame.tolist() for frame in points],
+                          data['phase_frames'].tolist(), float(data['frame_rate'])))
+    return clips
+
+
+def run_client(url, clip, fps, results):
+    frames, expected, frame_rate = clip
+    ws = Client.connect(url)
+    sent_at = {}
+    latencies = []
+    reps = []
+    done = threading.Event()
+
+    def receive():
+        while True:
+            event = json.loads(ws.receive())
+            if 'frame' in event and event['frame'] in sent_at:
+                latencies.append((time.perf_counter() - sent_at[event['frame']]) * 1000)
+            if event['type'] == 'rep':
+                reps.append(event['phase_frames'])
+            elif event['type'] in ('summary', 'error'):
+                done.set()
+                return
+
+    receiver = threading.Thread(target=receive, daemon=True)
+    receiver.start()
+    ws.send(json.dumps({'type': 'start', 'frame_rate': frame_rate}))
+    start = time.perf_counter()
+    for i, landmarks in enumerate(frames):
+        if fps:
+            time.sleep(max(0.0, start + i / fps - time.perf_counter()))
+        sent_at[i] = time.perf_counter()
+        ws.send(json.dumps({'type': 'landmarks', 'frame': i, 'landmarks': landmarks}))
+    ws.send(json.dumps({'type': 'stop'}))
+    done.wait(30)
+    results.append((reps == [expected], latencies))
+    try:
+        ws.close()
+    except ConnectionClosed:  # the server closes first after the summary
+        pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('files', nargs='*', default=sorted(glob.glob(os.path.join(LANDMARK_DIR, '*.npz'))))
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--fps', type=float, default=30, help='frames per second per client, 0 = unthrottled')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    init_live_feedback(app)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'ws://127.0.0.1:{server.server_port}/live'
+
+    clips = load_clips(args.files)
+    for sessions in args.sessions:
+        results = []
+        clients = [threading.Thread(target=run_client, args=(url, clips[i % len(clips)], args.fps, results))
+                   for i in range(sessions)]
+        start = time.perf_counter()
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.perf_counter() - start
+
+        latencies = np.concatenate([np.array(l) for _, l in results if l]) if results else np.array([])
+        frames = sum(len(clips[i % len(clips)][0]) for i in range(sessions))
+        stats = live_feedback.stats()['latency_ms']
+        print(f"{sessions:4} sessions: {sum(ok for ok, _ in results)}/{sessions} reps match, "
+              f"{frames / elapsed:8.0f} frames/s total, transition latency p50 {np.percentile(latencies, 50):.2f} ms "
+              f"p99 {np.percentile(latencies, 99):.2f} ms, server per-frame p99 {stats['p99']:.3f} ms")
+    server.shutdown()
@@ -0,0 +1,46 @@
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import tempfile
+import time
+
+import mediapipe as mp
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+from video_analysis import analyze_video
+
+VIDEO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'videos')
+
+# Serial vs pipelined analyze_video on the bundled clips, with the per-stage
+# counters of each run. The pipeline can only overlap stages when there are cores
+# to spare, so run this on the deployment hardware.
+
+
+def run(video_path, pipelined, render):
+    with tempfile.TemporaryDirectory() as scratch, mp.solutions.pose.Pose() as pose:
+        output_video_path = os.path.join(scratch, 'out.mp4') if render else None
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = analyze_video(video_path, output_video_path, pose, sampling='all', pipelined=pipelined)
+        return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('videos', nargs='*', default=sorted(glob.glob(os.path.join(VIDEO_DIR, 'sv*.mp4'))))
+    parser.add_argument('--landmarks-only', action='store_true', help='skip drawing and encoding')
+    args = parser.parse_args()
+
+    print(f'{os.cpu_count()} CPUs')
+    for video_path in args.videos:
+        serial_time, serial = run(video_path, False, not args.landmarks_only)
+        pipelined_time, pipelined = run(video_path, True, not args.landmarks_only)
+        same = serial['phase_frames'] == pipelined['phase_frames']
+        print(f'{os.path.basename(video_path)}: serial {serial_time:.2f}s, pipelined {pipelined_time:.2f}s '
+              f'({serial_time / pipelined_time:.2f}x), phase frames {"match" if same else "DIFFER"}')
+        for name, stats in pipelined['stages'].items():
+            print(f"  {name:7} {stats['fps'] or 0:9.1f} fps  busy {stats['busy_s']:6.2f}s  "
+                  f"starved {stats['starved_s']:6.2f}s  blocked {stats['blocked_s']:6.2f}s")
@@ -0,0 +1,64 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+from landmarks import LandmarkSeries
+from rep_segmentation import segment_reps
+
+LANDMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'landmarks')
+
+# Builds a multi-rep set by chaining recorded single-rep landmark files (see
+# replay_landmarks.py) and times segment_reps over it, checking every rep is found.
+# Each recording is also cut to start every CUT_STEP frames, so clips that begin
+# mid-descent, at the bottom or on the way up must segment without errors.
+CUT_STEP = 10
+
+
+def build_set(paths, reps):
+    clips = []
+    frame_rate = 30.0
+    for path in paths:
+        with np.load(path) as data:
+            clips.append(data['landmarks'])
+            frame_rate = float(data['frame_rate'])
+    return LandmarkSeries(np.concatenate([clips[i % len(clips)] for i in range(reps)]), frame_rate)
+
+
+def check_cuts(paths, step=CUT_STEP):
+    for path in paths:
+        with np.load(path) as data:
+            series = LandmarkSeries(data['landmarks'], float(data['frame_rate']))
+        found = {}
+        for cut in range(0, len(series), step):
+            found[cut] = len(segment_reps(series.window(cut, None)))
+        print(f"{os.path.basename(path)}: cut every {step} of {len(series)} frames, reps found per cut "
+              f"{' '.join(str(n) for n in found.values())}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('files', nargs='*', default=sorted(glob.glob(os.path.join(LANDMARK_DIR, '*.npz'))))
+    parser.add_argument('--reps', type=int, nargs='+', default=[5, 10, 100, 1000])
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    check_cuts(args.files)
+    for reps in args.reps:
+        series = build_set(args.files, reps)
+        times = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            found = segment_reps(series)
+            times.append(time.perf_counter() - start)
+        best = min(times)
+        print(f'{reps:5} reps, {len(series):7} frames: {len(found):5} reps found in {best * 1000:8.2f} ms '
+              f'({len(series) / best:,.0f} frames/s)')
+        for rep in found[:min(reps, len(args.files))] if reps <= 10 else []:
+            print(f"      frames {rep['start']}-{rep['bottom']}-{rep['end']}  {rep['lowest_knee_angle']:6.1f} deg  "
+                  f"depth {'ok' if rep['depth_ok'] else 'insufficient'}  "
+                  f"down {rep['descent_s']:.2f}s up {rep['ascent_s']:.2f}s")
@@ -0,0 +1,76 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+from landmarks import LandmarkSeries
+from squat_analyzer import SquatAnalyzer
+from video_analysis import detect_landmarks
+
+VIDEO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'videos')
+
+# Pose inference throughput and landmark accuracy at reduced inference resolutions.
+# Each clip is decoded once (optionally upscaled with --scale to stand in for 1080p /
+# 4K phone footage) and every frame goes through detect_landmarks at each
+# inference size. Deviation is measured in full-resolution pixels against running
+# inference on the untouched frames, and phase frames are compared the same way.
+INFERENCE_SIZES = [0, 1280, 960, 640, 480, 320]
+
+
+def read_frames(video_path, scale):
+    cap = cv2.VideoCapture(video_path)
+    frame_rate = cap.get(cv2.CAP_PROP_FPS) or 30
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if scale != 1:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+        frames.append(frame)
+    cap.release()
+    return frames, frame_rate
+
+
+def run(frames, frame_rate, inference_size, model_complexity):
+    with mp.solutions.pose.Pose(model_complexity=model_complexity) as pose:
+        start = time.perf_counter()
+        landmarks = [detect_landmarks(pose, frame, inference_size) for frame in frames]
+        elapsed = time.perf_counter() - start
+    return elapsed, LandmarkSeries.from_frames(landmarks, frame_rate)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('videos', nargs='*', default=sorted(glob.glob(os.path.join(VIDEO_DIR, 'sv*.mp4'))))
+    parser.add_argument('--scale', type=float, default=1.0, help='upscale decoded frames, e.g. 2.67 for ~1080x1920')
+    parser.add_argument('--sizes', type=int, nargs='+', default=INFERENCE_SIZES, help='0 = full resolution')
+    parser.add_argument('--model-complexity', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'video':8} {'frame':>10} {'infer':>6} {'frames/s':>9} {'speedup':>8} {'mean px':>8} {'max px':>7}  "
+          f"phase_frames")
+    for video_path in args.videos:
+        frames, frame_rate = read_frames(video_path, args.scale)
+        height, width = frames[0].shape[:2]
+
+        baseline_time, baseline = None, None
+        for inference_size in args.sizes:
+            elapsed, series = run(frames, frame_rate, inference_size, args.model_complexity)
+            if baseline is None:
+                baseline_time, baseline = elapsed, series
+
+            deviation = np.linalg.norm(series.points - baseline.points, axis=-1)
+            both = series.valid & baseline.valid
+            mean_px = np.mean(deviation[both]) if both.any() else float('nan')
+            max_px = np.max(deviation[both]) if both.any() else float('nan')
+            phases = SquatAnalyzer(frame_rate).run(series).result()['phase_frames']
+            print(f"{os.path.basename(video_path):8} {f'{width}x{height}':>10} {inference_size or 'full':>6} "
+                  f"{len(frames) / elapsed:9.1f} {baseline_time / elapsed:7.2f}x {mean_px:8.2f} {max_px:7.1f}  "
+                  f"{phases}")
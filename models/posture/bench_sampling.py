@@ -0,0 +1,58 @@
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import tempfile
+import time
+
+import mediapipe as mp
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+from video_analysis import analyze_video
+
+VIDEO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'videos')
+
+# Compares pose-estimation frame sampling modes on the bundled clips: wall time,
+# frames sent through pose.process, and how far the detected phase frames move
+# relative to running pose estimation on every frame.
+CONFIGS = [
+    ('all', 30),
+    ('fixed', 15),
+    ('fixed', 10),
+    ('adaptive', 15),
+    ('adaptive', 10),
+]
+
+
+def run(video_path, sampling, target_fps):
+    with tempfile.TemporaryDirectory() as scratch, mp.solutions.pose.Pose() as pose:
+        start = time.perf_counter()
+        # analyze_video logs every phase change; keep the table readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = analyze_video(video_path, os.path.join(scratch, 'out.mp4'), pose,
+                                   sampling=sampling, target_fps=target_fps)
+        return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('videos', nargs='*', default=sorted(glob.glob(os.path.join(VIDEO_DIR, 'sv*.mp4'))))
+    args = parser.parse_args()
+
+    print(f"{'video':8} {'mode':>14} {'pose/frames':>12} {'time (s)':>9} {'speedup':>8}  phase_frames (shift vs all)")
+    for video_path in args.videos:
+        baseline_time, baseline = None, None
+        for sampling, target_fps in CONFIGS:
+            elapsed, result = run(video_path, sampling, target_fps)
+            if baseline is None:
+                baseline_time, baseline = elapsed, result
+
+            if len(result['phase_frames']) == len(baseline['phase_frames']):
+                shift = [a - b for a, b in zip(result['phase_frames'], baseline['phase_frames'])]
+            else:
+                shift = 'phase count differs'
+            print(f"{os.path.basename(video_path):8} {f'{sampling}@{target_fps:g}':>14} "
+                  f"{result['pose_frames']:>5}/{result['frames']:<6} {elapsed:9.2f} {baseline_time / elapsed:7.2f}x  "
+                  f"{result['phase_frames']} ({shift})")
@@ -0,0 +1,59 @@
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+
+import mediapipe as mp
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+from segment_analysis import segmented_extractor
+from video_analysis import analyze_video
+
+VIDEO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'videos')
+
+# Serial analyze_video against segment-parallel landmark extraction: wall time and
+# whether phase frames and feedback match. The bundled clips are only a few seconds
+# long, so --min-frames defaults low enough for them to be split at all.
+
+
+def serial(video_path, sampling, target_fps):
+    with mp.solutions.pose.Pose() as pose, contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = analyze_video(video_path, None, pose, sampling=sampling, target_fps=target_fps)
+        return time.perf_counter() - start, result
+
+
+def segmented(video_path, segments, sampling, target_fps, min_frames):
+    start = time.perf_counter()
+    extracted = segmented_extractor.extract(video_path, segments, sampling=sampling, target_fps=target_fps,
+                                            min_frames=min_frames)
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = analyze_video(video_path, None, None, sampling=sampling, target_fps=target_fps, cached=extracted)
+    return time.perf_counter() - start, result, extracted['segments']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('videos', nargs='*', default=sorted(glob.glob(os.path.join(VIDEO_DIR, 'sv*.mp4'))))
+    parser.add_argument('--segments', type=int, nargs='+', default=[2, 3])
+    parser.add_argument('--sampling', default='all')
+    parser.add_argument('--target-fps', type=float, default=30)
+    parser.add_argument('--min-frames', type=int, default=30)
+    args = parser.parse_args()
+
+    # Start the worker processes before timing anything
+    segmented_extractor.extract(args.videos[0], 1, sampling=args.sampling, target_fps=args.target_fps)
+
+    print(f'{os.cpu_count()} CPUs, {segmented_extractor.max_workers} segment workers')
+    for video_path in args.videos:
+        serial_time, expected = serial(video_path, args.sampling, args.target_fps)
+        print(f"{os.path.basename(video_path)}: serial {serial_time:.2f}s {expected['phase_frames']}")
+        for segments in args.segments:
+            elapsed, result, used = segmented(video_path, segments, args.sampling, args.target_fps, args.min_frames)
+            same = result['phase_frames'] == expected['phase_frames'] and result['feedback'] == expected['feedback']
+            print(f"  {used} segments: {elapsed:.2f}s ({serial_time / elapsed:.2f}x) {result['phase_frames']} "
+                  f"{'match' if same else 'DIFFER'}")
+    segmented_extractor.shutdown()
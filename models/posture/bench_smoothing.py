@@ -0,0 +1,97 @@
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+
+import mediapipe as mp
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+from landmark_filter import smooth_series
+from landmarks import LandmarkSeries, knee_angles
+from rep_segmentation import segment_reps
+from squat_analyzer import SquatAnalyzer
+from video_analysis import analyze_video
+
+VIDEO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'videos')
+
+# Pose model complexity 0/1/2, with and without the One-Euro landmark filter, on
+# the bundled clips: pose frames/s, phase frames and how often the knee angle
+# crosses the 95 degree BOTTOM threshold (twice per clean rep; jitter adds more).
+# Agreement is against complexity 1 without smoothing, the current default.
+#
+# Every frame goes through pose estimation, so filtering the recorded series
+# afterwards gives exactly what the streaming filter gives inside analyze_video.
+# --jitter adds Gaussian noise (in pixels) to the landmarks before filtering, to
+# stand in for the lite model where it can't be downloaded.
+
+
+def extract(video_path, model_complexity):
+    with mp.solutions.pose.Pose(model_complexity=model_complexity) as pose, \
+            contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = analyze_video(video_path, None, pose, sampling='all')
+        elapsed = time.perf_counter() - start
+    return LandmarkSeries(result['landmarks'], result['frame_rate']), result['frames'] / elapsed
+
+
+def evaluate(series):
+    phase_frames = SquatAnalyzer(series.frame_rate).run(series).result()['phase_frames']
+    knee = knee_angles(LandmarkSeries(np.trunc(series.points)))
+    knee = knee[~np.isnan(knee)]
+    crossings = int(np.count_nonzero(np.diff(knee < 95)))
+    return phase_frames, crossings, len(segment_reps(series))
+
+
+def model_available(model_complexity):
+    try:
+        with mp.solutions.pose.Pose(model_complexity=model_complexity):
+            return True
+    except Exception:
+        return False
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('videos', nargs='*', default=sorted(glob.glob(os.path.join(VIDEO_DIR, 'sv*.mp4'))))
+    parser.add_argument('--complexities', type=int, nargs='+', default=[0, 1, 2])
+    parser.add_argument('--jitter', type=float, nargs='+', default=[0.0])
+    args = parser.parse_args()
+
+    complexities = []
+    for model_complexity in args.complexities:
+        if model_available(model_complexity):
+            complexities.append(model_complexity)
+        else:
+            print(f'complexity {model_complexity}: model not available (downloaded on first use), skipped')
+
+    rng = np.random.default_rng(0)
+    print(f"{'video':8} {'model':>5} {'jitter':>6} {'smoothing':>9} {'pose fps':>8} {'95 crossings':>12} {'reps':>4}  "
+          f"phase_frames")
+    for video_path in args.videos:
+        reference = None
+        for model_complexity in sorted(complexities, key=lambda c: c != 1):
+            raw, fps = extract(video_path, model_complexity)
+            for jitter in args.jitter:
+                noisy = LandmarkSeries(raw.points + rng.normal(0, jitter, raw.points.shape) if jitter else raw.points,
+                                       raw.frame_rate)
+                for smoothing in ('none', 'one_euro'):
+                    start = time.perf_counter()
+                    series = smooth_series(noisy, smoothing)
+                    filter_time = time.perf_counter() - start
+                    phase_frames, crossings, reps = evaluate(series)
+                    if reference is None:
+                        reference = phase_frames
+
+                    if phase_frames == reference:
+                        agreement = 'match'
+                    elif len(phase_frames) == len(reference):
+                        agreement = f'shift {[a - b for a, b in zip(phase_frames, reference)]}'
+                    else:
+                        agreement = 'DIFFERENT PHASES'
+                    total_fps = len(series) / (len(series) / fps + filter_time)
+                    print(f"{os.path.basename(video_path):8} {model_complexity:>5} {jitter:>6g} {smoothing:>9} "
+                          f"{total_fps:8.1f} {crossings:>12} {reps:>4}  {phase_frames} {agreement}")
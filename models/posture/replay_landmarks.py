@@ -0,0 +1,102 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+from landmarks import LandmarkSeries
+from squat_analyzer import SquatAnalyzer
+
+POSTURE_DIR = os.path.dirname(os.path.abspath(__file__))
+LANDMARK_DIR = os.path.join(POSTURE_DIR, 'landmarks')
+
+# Records the landmarks of squat videos once, then replays them through the shared
+# SquatAnalyzer without decoding video or running MediaPipe, so threshold changes
+# can be regression-tested and benchmarked offline.
+#
+#   python replay_landmarks.py record videos/sv*.mp4
+#   python replay_landmarks.py replay --check
+#   python replay_landmarks.py replay --bottom-knee-angle 100 --repeat 200
+
+
+def record(video_paths, out_dir):
+    import contextlib
+    import io
+
+    import mediapipe as mp
+    from video_analysis import analyze_video
+
+    os.makedirs(out_dir, exist_ok=True)
+    for video_path in video_paths:
+        with mp.solutions.pose.Pose() as pose, contextlib.redirect_stdout(io.StringIO()):
+            result = analyze_video(video_path, None, pose, sampling='all')
+
+        out_path = os.path.join(out_dir, os.path.splitext(os.path.basename(video_path))[0] + '.npz')
+        np.savez_compressed(out_path, landmarks=result['landmarks'], frame_rate=result['frame_rate'],
+                            phase_frames=np.array(result['phase_frames']), feedback=result['feedback'])
+        print(f"{out_path}: {len(result['landmarks'])} frames, phase_frames {result['phase_frames']}, "
+              f"{result['feedback']!r}")
+
+
+def load_recording(path):
+    with np.load(path) as data:
+        series = LandmarkSeries(data['landmarks'], float(data['frame_rate']))
+        expected = {'phase_frames': data['phase_frames'].tolist(), 'feedback': str(data['feedback'])}
+    return series, expected
+
+
+def replay(paths, analyzer_options, repeat, check):
+    mismatches = 0
+    for path in paths:
+        series, expected = load_recording(path)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = SquatAnalyzer(series.frame_rate, **analyzer_options).run(series).result()
+        elapsed = time.perf_counter() - start
+
+        status = ''
+        if check:
+            matches = (result['phase_frames'] == expected['phase_frames']
+                       and result['feedback'] == expected['feedback'])
+            mismatches += not matches
+            status = 'ok' if matches else f"MISMATCH (recorded {expected['phase_frames']} {expected['feedback']!r})"
+        print(f"{os.path.basename(path):10} {len(series) * repeat / elapsed:12,.0f} frames/s  "
+              f"{result['phase_frames']} {result['feedback']!r} {status}")
+    return mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Record and replay squat landmark files')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help='extract landmarks from videos')
+    record_parser.add_argument('videos', nargs='+')
+    record_parser.add_argument('--out-dir', default=LANDMARK_DIR)
+
+    replay_parser = subparsers.add_parser('replay', help='run recorded landmarks through SquatAnalyzer')
+    replay_parser.add_argument('files', nargs='*', default=sorted(glob.glob(os.path.join(LANDMARK_DIR, '*.npz'))))
+    replay_parser.add_argument('--repeat', type=int, default=1, help='replay each file N times for timing')
+    replay_parser.add_argument('--check', action='store_true', help='fail if results differ from the recording')
+    replay_parser.add_argument('--descent-shoulder-drop', type=float, default=1.05)
+    replay_parser.add_argument('--bottom-knee-angle', type=float, default=95)
+    replay_parser.add_argument('--ascent-knee-angle', type=float, default=90)
+    replay_parser.add_argument('--end-knee-angle', type=float, default=170)
+    replay_parser.add_argument('--require-hip-below-knee', action='store_true')
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record(args.videos, args.out_dir)
+    else:
+        options = {
+            'descent_shoulder_drop': args.descent_shoulder_drop,
+            'bottom_knee_angle': args.bottom_knee_angle,
+            'ascent_knee_angle': args.ascent_knee_angle,
+            'end_knee_angle': args.end_knee_angle,
+            'require_hip_below_knee': args.require_hip_below_knee,
+        }
+        if replay(args.files, options, args.repeat, args.check):
+            raise SystemExit(1)
@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from bench_ingest import peak_rss_mb
+from bench_pairs import synthetic_meets
+from meet_pairs import expand_pairs, load_pairs
+from pair_batches import (FEATURE_COLUMNS, TARGET_COLUMNS, TEST, TRAIN, VALIDATION, count_split, fit_scaler,
+                          iter_batches, read_block, split_mask)
+
+# score.py's in-memory training input (DataFrame of every pair, fit_transform,
+# train_test_split, 32-row slices) against pair_batches streaming one epoch of
+# shuffled training batches from the memory-mapped pairs. Each runs in a fresh
+# process at two dataset sizes, so peak RSS shows what grows with the data. The
+# streamed scaler, splits and epochs are checked against full in-memory versions.
+#
+# Peak RSS counts the memory-mapped pages read, which are page cache the kernel can
+# drop; anonymous RSS, sampled every SAMPLE_BATCHES batches, is the process's own heap.
+SAMPLE_BATCHES = 1024
+
+
+def anon_rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('RssAnon:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run(mode, pairs_dir, batch_size):
+    start = time.perf_counter()
+    pairs = load_pairs(pairs_dir)
+    batches = 0
+    anon_peak = 0.0
+    if mode == 'memory':
+        df = pd.DataFrame(pairs)
+        X_scaled = StandardScaler().fit_transform(df[FEATURE_COLUMNS])
+        X_train, X_test, y_train, y_test = train_test_split(X_scaled, df[TARGET_COLUMNS], test_size=0.2,
+                                                            random_state=42)
+        y_train = y_train.to_numpy()
+        prepared = time.perf_counter() - start
+        anon_peak = anon_rss_mb()
+        order = np.random.default_rng(0).permutation(len(X_train))
+        for i in range(0, len(order), batch_size):
+            index = order[i:i + batch_size]
+            X_batch, y_batch = X_train[index], y_train[index]
+            batches += 1
+            if batches % SAMPLE_BATCHES == 0:
+                anon_peak = max(anon_peak, anon_rss_mb())
+    else:
+        scaler = fit_scaler(pairs)
+        prepared = time.perf_counter() - start
+        anon_peak = anon_rss_mb()
+        for X_batch, y_batch in iter_batches(pairs, scaler, TRAIN, batch_size):
+            batches += 1
+            if batches % SAMPLE_BATCHES == 0:
+                anon_peak = max(anon_peak, anon_rss_mb())
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'mode': mode, 'prepare_s': round(prepared, 2), 'epoch_s': round(elapsed - prepared, 2),
+                      'batches': batches, 'batches_per_s': round(batches / (elapsed - prepared)),
+                      'peak_rss_mb': round(peak_rss_mb()), 'peak_anon_rss_mb': round(anon_peak)}))
+
+
+def check(pairs):
+    n = len(pairs[FEATURE_COLUMNS[0]])
+    full = StandardScaler().fit(read_block(pairs, 0, n, FEATURE_COLUMNS))
+    scaler = fit_scaler(pairs, block_rows=10_000)
+    same_scaler = np.allclose(scaler.mean_, full.mean_, rtol=1e-6) and np.allclose(scaler.scale_, full.scale_,
+                                                                                  rtol=1e-6)
+
+    counts = {split: count_split(pairs, split) for split in (TEST, VALIDATION, TRAIN)}
+    targets = read_block(pairs, 0, n, TARGET_COLUMNS)
+    sort_rows = lambda rows: rows[np.lexsort(rows.T[::-1])]
+    epochs = []
+    for seed in (0, 1):
+        y = np.concatenate([y_batch for _, y_batch in iter_batches(pairs, scaler, TRAIN, 32, seed=seed,
+                                                                   block_rows=10_000)])
+        epochs.append(y)
+    expected = sort_rows(targets[split_mask(0, n, TRAIN)])
+    once = all(np.array_equal(sort_rows(y), expected) for y in epochs)
+    reshuffled = not np.array_equal(epochs[0], epochs[1])
+    print(f"{n} pairs split {counts} ({sum(counts.values()) == n and 'all rows' or 'ROWS MISSING'}); scaler "
+          f"matches a full fit: {same_scaler}; every train row once per epoch: {once}; new order each epoch: "
+          f"{reshuffled}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lifters', type=int, nargs='+', default=[200_000, 2_000_000])
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--run', choices=['memory', 'stream'])
+    parser.add_argument('--pairs')
+    args = parser.parse_args()
+
+    if args.run:
+        run(args.run, args.pairs, args.batch_size)
+        sys.exit()
+
+    work_dir = tempfile.mkdtemp(prefix='batches_')
+    pairs_dir = os.path.join(work_dir, 'op_pairs')
+    try:
+        expand_pairs(synthetic_meets(20_000), pairs_dir)
+        check(load_pairs(pairs_dir))
+        for n_lifters in args.lifters:
+            total = expand_pairs(synthetic_meets(n_lifters, seed=1), pairs_dir)
+            print(f'{n_lifters} lifters, {total} pairs')
+            for mode in ('memory', 'stream'):
+                output = subprocess.run([sys.executable, __file__, '--run', mode, '--pairs', pairs_dir,
+                                         '--batch-size', str(args.batch_size)],
+                                        capture_output=True, text=True, check=True).stdout
+                print(output.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
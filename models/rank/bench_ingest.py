@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from meet_cache import MEET_DTYPES, ingest_meets, load_meets
+
+# The old op_data.csv load in score.py (one read_csv with object dtypes, then
+# to_datetime, .replace and the filters on the whole frame) against meet_cache's
+# chunked, typed ingestion and a load from its cache. Each runs in a fresh process
+# so peak RSS is its own. Input is a synthetic CSV with the OpenPowerlifting
+# columns; the cleaned meets of both paths are checked to be the same rows.
+
+OPL_COLUMNS = ['Name', 'Sex', 'Event', 'Equipment', 'Age', 'AgeClass', 'BirthYearClass', 'Division', 'BodyweightKg',
+               'WeightClassKg', 'Squat1Kg', 'Squat2Kg', 'Squat3Kg', 'Best3SquatKg', 'Bench1Kg', 'Bench2Kg', 'Bench3Kg',
+               'Best3BenchKg', 'Deadlift1Kg', 'Deadlift2Kg', 'Deadlift3Kg', 'Best3DeadliftKg', 'TotalKg', 'Place',
+               'Dots', 'Wilks', 'Tested', 'Country', 'Federation', 'Date', 'MeetCountry', 'MeetName']
+
+
+def write_synthetic_csv(path, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    lifters = rng.integers(0, rows // 3, rows)
+    lift = lambda low, high: np.where(rng.random(rows) < 0.05, np.nan, rng.integers(low, high, rows) * 2.5)
+    data = {
+        'Name': pd.Series(lifters).map('Lifter Number {:07d}'.format),
+        'Sex': rng.choice(['M', 'F', 'Mx'], rows, p=[0.7, 0.29, 0.01]),
+        'Event': rng.choice(['SBD', 'B', 'D', 'BD'], rows, p=[0.7, 0.2, 0.05, 0.05]),
+        'Equipment': rng.choice(['Raw', 'Wraps', 'Single-ply', 'Multi-ply', 'Unlimited', 'Straps'], rows),
+        'Age': np.where(rng.random(rows) < 0.3, np.nan, rng.integers(28, 140, rows) / 2),
+        'AgeClass': '24-34', 'BirthYearClass': '24-39', 'Division': 'Open',
+        'BodyweightKg': rng.uniform(45, 140, rows).round(2), 'WeightClassKg': '93',
+        'Best3SquatKg': lift(-20, 160), 'Best3BenchKg': lift(-10, 110), 'Best3DeadliftKg': lift(-20, 180),
+        'TotalKg': 500.0, 'Place': '1', 'Dots': 350.12, 'Wilks': 340.56, 'Tested': 'Yes', 'Country': 'USA',
+        'Federation': 'USAPL', 'MeetCountry': 'USA', 'MeetName': 'Synthetic Open',
+        'Date': (pd.Timestamp('1990-01-01') + pd.to_timedelta(rng.integers(0, 365 * 35, rows), unit='D'))
+        .strftime('%Y-%m-%d'),
+    }
+    for attempt in ('Squat1Kg', 'Squat2Kg', 'Squat3Kg', 'Bench1Kg', 'Bench2Kg', 'Bench3Kg', 'Deadlift1Kg',
+                    'Deadlift2Kg', 'Deadlift3Kg'):
+        data[attempt] = 100.0
+    pd.DataFrame(data)[OPL_COLUMNS].to_csv(path, index=False)
+
+
+# score.py's load before meet_cache
+def old_load(csv_path):
+    df = pd.read_csv(csv_path, usecols=['Name', 'Sex', 'Event', 'Equipment', 'Age', 'BodyweightKg',
+                                        'Best3SquatKg', 'Best3BenchKg', 'Best3DeadliftKg', 'Date'])
+    df.dropna(axis=0, how='any', inplace=True)
+    df['Date'] = pd.to_datetime(df['Date'])
+    df = df[df['Sex'].isin(['M', 'F']) & (df['Event'] == 'SBD')
+            & (df['Best3SquatKg'] > 0) & (df['Best3BenchKg'] > 0) & (df['Best3DeadliftKg'] > 0)
+            & (df['Date'].dt.year >= 1996)]
+    df['Sex'] = df['Sex'].replace({'M': 1, 'F': 0})
+    df['Equipment'] = df['Equipment'].replace({'Wraps': 1, 'Multi-ply': 1, 'Single-ply': 1,
+                                               'Unlimited': 1, 'Straps': 1, 'Raw': 0})
+    return df.sort_values(by=['Name', 'Date']).reset_index(drop=True)
+
+
+# The cleaned meets as one array of sorted rows (lifters excluded), to compare the
+# two paths regardless of the order lifters come in
+def canonical_rows(columns):
+    rows = np.column_stack([np.asarray(columns[name], dtype=np.float64) for name in
+                            ('Sex', 'Equipment', 'Age', 'BodyweightKg', 'Best3SquatKg', 'Best3BenchKg',
+                             'Best3DeadliftKg')] +
+                           [np.asarray(columns['Date']).astype('datetime64[D]').astype(np.float64)])
+    return rows[np.lexsort(rows.T[::-1])]
+
+
+# ru_maxrss survives exec, so it would report the parent's peak; VmHWM doesn't
+def peak_rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(mode, csv_path, cache_dir):
+    start = time.perf_counter()
+    if mode == 'old':
+        df = old_load(csv_path)
+        columns = {name: df[name].to_numpy() if name == 'Date' else df[name].to_numpy().astype(np.float32)
+                   for name in MEET_DTYPES if name != 'LifterId'}
+        lifters = df['Name'].nunique()
+    else:
+        if mode == 'ingest':
+            ingest_meets(csv_path, cache_dir)
+        columns, meta = load_meets(csv_path, cache_dir)
+        # Read every column into memory, as training on them would
+        columns = {name: np.array(values) for name, values in columns.items()}
+        lifters = meta['lifters']
+    elapsed = time.perf_counter() - start
+    peak_mb = peak_rss_mb()
+    np.save(os.path.join(os.path.dirname(cache_dir), f'{mode}_rows.npy'), canonical_rows(columns))
+    print(json.dumps({'mode': mode, 'seconds': round(elapsed, 2), 'peak_rss_mb': round(peak_mb),
+                      'meets': len(columns['Sex']), 'lifters': int(lifters)}))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--run', choices=['old', 'ingest', 'cached'])
+    parser.add_argument('--csv')
+    parser.add_argument('--cache')
+    args = parser.parse_args()
+
+    if args.run:
+        run(args.run, args.csv, args.cache)
+        sys.exit()
+
+    work_dir = tempfile.mkdtemp(prefix='ingest_')
+    csv_path = os.path.join(work_dir, 'op_data.csv')
+    cache_dir = os.path.join(work_dir, 'op_meets')
+    write_synthetic_csv(csv_path, args.rows)
+    print(f'{args.rows} rows, {os.path.getsize(csv_path) / 2 ** 20:.0f} MB CSV')
+    for mode in ('old', 'ingest', 'cached'):
+        output = subprocess.run([sys.executable, __file__, '--run', mode, '--csv', csv_path, '--cache', cache_dir],
+                                capture_output=True, text=True, check=True).stdout
+        print(output.strip().splitlines()[-1])
+    cache_mb = sum(os.path.getsize(os.path.join(cache_dir, f'{name}.npy')) for name in MEET_DTYPES) / 2 ** 20
+    same = all(np.array_equal(np.load(os.path.join(work_dir, 'old_rows.npy')),
+                              np.load(os.path.join(work_dir, f'{mode}_rows.npy'))) for mode in ('ingest', 'cached'))
+    print(f'cache {cache_mb:.0f} MB, same cleaned meets as the old load: {same}')
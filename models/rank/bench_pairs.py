@@ -0,0 +1,106 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from meet_pairs import PAIR_COLUMNS, expand_pairs, load_pairs
+
+# meet_pairs.expand_pairs against the per-lifter nested loop score.py used to run,
+# on a synthetic meet table shaped like the cleaned OpenPowerlifting data (most
+# lifters with one or two meets, a long tail with dozens). The loop only runs on
+# --loop-lifters lifters; its output must match the vectorized one exactly.
+
+
+def synthetic_meets(n_lifters, seed=0):
+    rng = np.random.default_rng(seed)
+    meets = np.minimum(rng.geometric(0.35, n_lifters), 120)
+    n = int(meets.sum())
+    lifter = np.repeat(np.arange(n_lifters), meets)
+    first = rng.integers(0, 365 * 25, n_lifters)
+    gaps = rng.exponential(200, n).astype(np.int64)
+    starts = np.cumsum(meets) - meets
+    days = np.repeat(first, meets) + np.cumsum(gaps) - np.repeat(np.cumsum(gaps)[starts] - gaps[starts], meets)
+    return pd.DataFrame({
+        'Name': pd.Series(lifter).map('Lifter {:07d}'.format),
+        'Sex': rng.integers(0, 2, n),
+        'Equipment': rng.integers(0, 2, n),
+        'Age': rng.integers(30, 120, n) / 2,
+        'BodyweightKg': rng.uniform(45, 140, n).round(2),
+        'Best3SquatKg': rng.integers(16, 160, n) * 2.5,
+        'Best3BenchKg': rng.integers(10, 110, n) * 2.5,
+        'Best3DeadliftKg': rng.integers(20, 180, n) * 2.5,
+        'Date': pd.Timestamp('1996-01-01') + pd.to_timedelta(days, unit='D'),
+    }).sort_values(by=['Name', 'Date']).reset_index(drop=True)
+
+
+def nested_loop(df):
+    result = []
+    for name, group in df.groupby('Name'):
+        records = group.to_dict('records')
+        for i in range(len(records)):
+            for j in range(i + 1, len(records)):
+                current = records[i]
+                future = records[j]
+                result.append({
+                    'Sex': current['Sex'],
+                    'CurrentEquipment': current['Equipment'],
+                    'CurrentAge': current['Age'],
+                    'CurrentBodyweightKg': current['BodyweightKg'],
+                    'CurrentBest3SquatKg': current['Best3SquatKg'],
+                    'CurrentBest3BenchKg': current['Best3BenchKg'],
+                    'CurrentBest3DeadliftKg': current['Best3DeadliftKg'],
+                    'DiffDays': (future['Date'] - current['Date']).days,
+                    'FutureEquipment': future['Equipment'],
+                    'FutureAge': future['Age'],
+                    'FutureBodyweightKg': future['BodyweightKg'],
+                    'FutureBest3SquatKg': future['Best3SquatKg'],
+                    'FutureBest3BenchKg': future['Best3BenchKg'],
+                    'FutureBest3DeadliftKg': future['Best3DeadliftKg'],
+                })
+    return pd.DataFrame(result)
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lifters', type=int, default=1_000_000)
+    parser.add_argument('--loop-lifters', type=int, default=20_000)
+    parser.add_argument('--max-pairs', type=int, nargs='+', default=[0, 100])
+    parser.add_argument('--max-gap-days', type=int, nargs='+', default=[0, 730])
+    args = parser.parse_args()
+
+    out_dir = os.path.join(tempfile.mkdtemp(prefix='pairs_'), 'op_pairs')
+    try:
+        small = synthetic_meets(args.loop_lifters)
+        start = time.perf_counter()
+        expected = nested_loop(small)
+        loop_time = time.perf_counter() - start
+        start = time.perf_counter()
+        expand_pairs(small, out_dir, chunk_pairs=50_000)
+        vector_time = time.perf_counter() - start
+        pairs = load_pairs(out_dir)
+        match = all(np.array_equal(pairs[name], expected[name].to_numpy().astype(dtype))
+                    for name, dtype in PAIR_COLUMNS.items())
+        print(f"{args.loop_lifters} lifters, {len(small)} meets, {len(expected)} pairs: nested loop {loop_time:.2f} s, "
+              f"vectorized {vector_time:.3f} s ({loop_time / vector_time:.0f}x), identical: {match}; "
+              f"CSV {len(expected.to_csv(index=False)) / 2 ** 20:.1f} MB vs columns {dir_size(out_dir) / 2 ** 20:.1f} MB")
+
+        df = synthetic_meets(args.lifters, seed=1)
+        for max_pairs in args.max_pairs:
+            for max_gap_days in args.max_gap_days:
+                start = time.perf_counter()
+                total = expand_pairs(df, out_dir, max_pairs_per_lifter=max_pairs or None,
+                                     max_gap_days=max_gap_days or None)
+                elapsed = time.perf_counter() - start
+                print(f"{args.lifters} lifters, {len(df)} meets, max_pairs {max_pairs or '-':>4}, "
+                      f"max_gap_days {max_gap_days or '-':>4}: {total:>10} pairs in {elapsed:6.2f} s "
+                      f"({total / elapsed / 1e6:5.1f} M pairs/s), {dir_size(out_dir) / 2 ** 20:7.1f} MB")
+    finally:
+        shutil.rmtree(os.path.dirname(out_dir), ignore_errors=True)
@@ -0,0 +1,121 @@
+import argparse
+import time
+
+import numpy as np
+from scipy.linalg import pinv
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from elm_search import RCELMFactorization, candidate_rng, rc_elm_hidden, rc_elm_predict, rc_elm_train, woa_search
+
+# rank.py's old woa_optimization (10 fixed candidates retrained 20 times, scored on
+# training MAE) against elm_search.woa_search, serially and on a process pool. The
+# data is synthetic, with rank.py's seven features and a Place that follows the
+# total within each weight class. Every chosen (hidden, C) is retrained on the full
+# training split and scored on the same untouched test split. The old loop keeps its
+# pinv solve; the Cholesky and eigendecomposition solves are checked against it.
+
+
+def synthetic_results(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    sex = rng.integers(0, 2, rows)
+    weight_class = rng.integers(0, 10, rows)
+    strength = rng.normal(0, 1, rows)
+    bodyweight = 52 + 9 * weight_class + rng.uniform(0, 8, rows)
+    squat = bodyweight * (2.0 - 0.6 * sex + 0.3 * strength) + rng.normal(0, 8, rows)
+    bench = bodyweight * (1.3 - 0.5 * sex + 0.2 * strength) + rng.normal(0, 6, rows)
+    deadlift = bodyweight * (2.4 - 0.6 * sex + 0.3 * strength) + rng.normal(0, 8, rows)
+    X = np.column_stack([sex, rng.integers(0, 2, rows), rng.integers(0, 3, rows), weight_class, squat, bench,
+                         deadlift]).astype(np.float32)
+    total = (squat + bench + deadlift) / bodyweight
+    place = np.clip(np.round(12 - 6 * (total - total.mean()) / total.std() + rng.normal(0, 1.5, rows)), 1, 30)
+    return X, place.astype(np.float32).reshape(-1, 1)
+
+
+# The old rc_elm_train, with its explicit pseudo-inverse
+def pinv_rc_elm_train(X, y, hidden_neurons, C, rng=None):
+    W, b = rc_elm_hidden(X.shape[1], hidden_neurons, rng)
+    H = np.tanh(np.dot(X, W.T) + b)
+    beta = np.dot(pinv(np.dot(H.T, H) + C * np.identity(hidden_neurons)), np.dot(H.T, y))
+    return W, b, beta
+
+
+# Largest difference of the Cholesky and the factorized output weights from pinv's,
+# relative to the largest weight, over a few hidden sizes and C values
+def solver_error(X, y):
+    error = 0.0
+    for hidden in (10, 100, 200):
+        for C in (0.01, 1.0, 10.0):
+            _, _, expected = pinv_rc_elm_train(X, y, hidden, C, candidate_rng(hidden))
+            _, _, beta = rc_elm_train(X, y, hidden, C, candidate_rng(hidden))
+            W, b = rc_elm_hidden(X.shape[1], hidden, candidate_rng(hidden))
+            factorized = RCELMFactorization(np.tanh(np.dot(X, W.T) + b), y).beta(C)
+            scale = np.abs(expected).max()
+            error = max(error, np.abs(beta - expected).max() / scale, np.abs(factorized - expected).max() / scale)
+    return error
+
+
+# The old search, verbatim but for its result and the pinv solve
+def old_woa_optimization(X_train, y_train, search_agents=10, iterations=20):
+    lb, ub = 10, 200
+    best_hidden = None
+    best_C = None
+    best_score = float("inf")
+
+    hidden_neurons = np.random.randint(lb, ub, search_agents)
+    C_values = np.random.uniform(0.01, 10, search_agents)
+
+    for _ in range(iterations):
+        for i in range(search_agents):
+            W, b, beta = pinv_rc_elm_train(X_train, y_train, hidden_neurons[i], C_values[i])
+            y_pred = rc_elm_predict(X_train, W, b, beta)
+            score = mean_absolute_error(y_train, y_pred)
+
+            if score < best_score:
+                best_score = score
+                best_hidden = hidden_neurons[i]
+                best_C = C_values[i]
+
+    return best_hidden, best_C
+
+
+def test_mae(X_train, y_train, X_test, y_test, hidden, C):
+    W, b, beta = rc_elm_train(X_train, y_train, hidden, C, candidate_rng(hidden))
+    return mean_absolute_error(y_test, rc_elm_predict(X_test, W, b, beta))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2])
+    args = parser.parse_args()
+
+    X, y = synthetic_results(args.rows)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X_train)
+    X_test = scaler.transform(X_test)
+    X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=0.2, random_state=42)
+
+    print(f"Cholesky and factorized output weights vs pinv: max relative difference "
+          f"{solver_error(X_train, y_train):.1e}")
+
+    np.random.seed(0)
+    start = time.perf_counter()
+    hidden, C = old_woa_optimization(X_train, y_train)
+    old_time = time.perf_counter() - start
+    print(f"{args.rows} rows; old loop: 200 trainings, 10 distinct, {old_time:.2f} s -> hidden {hidden}, C {C:.3g}, "
+          f"test MAE {test_mae(X_train, y_train, X_test, y_test, hidden, C):.4f}")
+
+    results = []
+    for workers in args.workers:
+        start = time.perf_counter()
+        search = woa_search(X_fit, y_fit, X_val, y_val, workers=workers)
+        elapsed = time.perf_counter() - start
+        results.append((search['hidden_neurons'], search['C']))
+        print(f"woa_search, {workers} worker(s): {search['evaluations']} candidates scored for {search['proposals']} "
+              f"proposed, {search['hidden_sizes']} factorizations, {elapsed:.2f} s ({old_time / elapsed:.1f}x) -> "
+              f"hidden {search['hidden_neurons']}, C {search['C']:.3g}, validation MAE {search['score']:.4f}, test MAE "
+              f"{test_mae(X_train, y_train, X_test, y_test, search['hidden_neurons'], search['C']):.4f}")
+    print(f"same result for every worker count: {len(set(results)) == 1}")
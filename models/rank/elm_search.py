@@ -0,0 +1,188 @@
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.linalg import eigh, solve
+from sklearn.metrics import mean_absolute_error
+
+ELM_SEARCH_WORKERS = int(os.getenv("ELM_SEARCH_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+# Search space: hidden neurons, and C on a log scale (0.01 to 10, as before).
+# Candidates are memoized on (hidden, log10 C rounded to C_DECIMALS), so whales
+# that converge on the same spot don't retrain it.
+HIDDEN_RANGE = (10, 200)
+LOG_C_RANGE = (-2.0, 1.0)
+C_DECIMALS = 1
+# Shape of the bubble-net spiral
+SPIRAL_B = 1.0
+# Hidden sizes whose factorization each search process keeps
+FACTOR_CACHE_SIZE = int(os.getenv("ELM_FACTOR_CACHE_SIZE", 64))
+
+# Each worker process keeps an evaluator over the training and validation arrays
+# for its lifetime
+_worker_evaluator = None
+
+
+def _init_worker(data, seed):
+    global _worker_evaluator
+    _worker_evaluator = CandidateEvaluator(data, seed)
+
+
+# Random input weights and biases of an RC-ELM hidden layer; rng draws them, the
+# global numpy generator if not given
+def rc_elm_hidden(input_dim, hidden_neurons, rng=None):
+    rng = np.random if rng is None else rng
+    W = rng.uniform(-1, 1, (hidden_neurons, input_dim))
+    b = rng.uniform(-1, 1, hidden_neurons)
+    return W, b
+
+
+# RC-ELM: random tanh hidden layer, output weights by regularized least squares
+def rc_elm_train(X, y, hidden_neurons, C, rng=None):
+    W, b = rc_elm_hidden(X.shape[1], hidden_neurons, rng)
+
+    # Hidden layer output
+    H = np.tanh(np.dot(X, W.T) + b)
+
+    # Compute output weights with regularization. H.T H + C I is symmetric positive
+    # definite for C > 0, so a Cholesky solve replaces the explicit (pinv) inverse.
+    beta = solve(np.dot(H.T, H) + C * np.identity(hidden_neurons), np.dot(H.T, y), assume_a='pos')
+    return W, b, beta
+
+
+def rc_elm_predict(X, W, b, beta):
+    H = np.tanh(np.dot(X, W.T) + b)
+    return np.dot(H, beta)
+
+
+# Output weights of one hidden layer for any C from a single factorization: with
+# H.T H = V diag(l) V.T, (H.T H + C I)^-1 H.T y = V diag(1 / (l + C)) V.T H.T y, so
+# each C costs a diagonal scaling and a product with V instead of a new solve
+class RCELMFactorization:
+    def __init__(self, H, y):
+        eigenvalues, self.V = eigh(np.dot(H.T, H))
+        # H.T H is positive semi-definite; clip the round-off below zero
+        self.eigenvalues = np.maximum(eigenvalues, 0)
+        self.projected = np.dot(self.V.T, np.dot(H.T, y))
+
+    def beta(self, C):
+        return np.dot(self.V, self.projected / (self.eigenvalues + C)[:, None])
+
+
+# The hidden weights of a candidate depend only on the seed and its hidden size, so
+# an evaluation is repeatable and the final model can be retrained identically
+def candidate_rng(hidden_neurons, seed=0):
+    return np.random.default_rng([seed, hidden_neurons])
+
+
+# (hidden neurons, C) for a whale position [hidden, log10 C]
+def candidate(position):
+    hidden = int(np.clip(round(position[0]), *HIDDEN_RANGE))
+    log_c = round(float(np.clip(position[1], *LOG_C_RANGE)), C_DECIMALS)
+    return hidden, log_c
+
+
+# Validation MAE of candidates trained on the training split. The hidden layer,
+# its factorization and the validation hidden outputs are kept per hidden size
+# (the FACTOR_CACHE_SIZE most recently used), so every further C of that size
+# costs only RCELMFactorization.beta and one validation product.
+class CandidateEvaluator:
+    def __init__(self, data, seed=0, cache_size=FACTOR_CACHE_SIZE):
+        self.X_train, self.y_train, self.X_val, self.y_val = data
+        self.seed = seed
+        self.cache_size = cache_size
+        self.factorizations = 0
+        self._cache = OrderedDict()
+
+    def _factorization(self, hidden_neurons):
+        if hidden_neurons in self._cache:
+            self._cache.move_to_end(hidden_neurons)
+            return self._cache[hidden_neurons]
+        W, b = rc_elm_hidden(self.X_train.shape[1], hidden_neurons, candidate_rng(hidden_neurons, self.seed))
+        entry = (RCELMFactorization(np.tanh(np.dot(self.X_train, W.T) + b), self.y_train),
+                 np.tanh(np.dot(self.X_val, W.T) + b))
+        self.factorizations += 1
+        self._cache[hidden_neurons] = entry
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return entry
+
+    def scores(self, hidden_neurons, C_values):
+        factorization, H_val = self._factorization(hidden_neurons)
+        return [mean_absolute_error(self.y_val, np.dot(H_val, factorization.beta(C))) for C in C_values]
+
+
+def _evaluate_in_worker(hidden_neurons, C_values):
+    return _worker_evaluator.scores(hidden_neurons, C_values)
+
+
+# Whale Optimization Algorithm (Mirjalili & Lewis, 2016) over [hidden, log10 C],
+# scored by MAE on the held-out validation split. Each iteration the whales either
+# encircle the best candidate so far, search towards a random whale (while |A| >= 1
+# early on) or spiral in on the best; a shrinks from 2 to 0 over the iterations.
+# The candidates of an iteration that haven't been seen are grouped by hidden size
+# and trained in parallel on workers processes (in this process with workers=1).
+def woa_search(X_train, y_train, X_val, y_val, search_agents=10, iterations=20, seed=0,
+               workers=ELM_SEARCH_WORKERS):
+    rng = np.random.default_rng(seed)
+    low = np.array([HIDDEN_RANGE[0], LOG_C_RANGE[0]], dtype=float)
+    high = np.array([HIDDEN_RANGE[1], LOG_C_RANGE[1]], dtype=float)
+    positions = rng.uniform(low, high, (search_agents, 2))
+
+    data = (X_train, y_train, X_val, y_val)
+    scores = {}
+    best_key, best_position = None, None
+    history = []
+    executor = evaluator = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=_init_worker, initargs=(data, seed))
+    else:
+        evaluator = CandidateEvaluator(data, seed)
+    try:
+        for t in range(iterations):
+            keys = [candidate(position) for position in positions]
+            pending = {}
+            for hidden, log_c in sorted(set(keys) - scores.keys()):
+                pending.setdefault(hidden, []).append(log_c)
+            C_values = [[10 ** log_c for log_c in log_cs] for log_cs in pending.values()]
+            if executor is not None:
+                results = executor.map(_evaluate_in_worker, list(pending), C_values)
+            else:
+                results = (evaluator.scores(hidden, values) for hidden, values in zip(pending, C_values))
+            for (hidden, log_cs), values in zip(pending.items(), results):
+                scores.update(zip([(hidden, log_c) for log_c in log_cs], values))
+
+            for key in keys:
+                if best_key is None or scores[key] < scores[best_key]:
+                    best_key, best_position = key, np.array(key, dtype=float)
+            history.append(scores[best_key])
+
+            a = 2 - 2 * t / max(1, iterations - 1)
+            for i in range(search_agents):
+                A = 2 * a * rng.random(2) - a
+                coefficient = 2 * rng.random(2)
+                if rng.random() < 0.5:
+                    # Encircle the best whale, or move relative to a random one to explore
+                    target = best_position if np.all(np.abs(A) < 1) else positions[rng.integers(search_agents)]
+                    positions[i] = target - A * np.abs(coefficient * target - positions[i])
+                else:
+                    l = rng.uniform(-1, 1)
+                    positions[i] = np.abs(best_position - positions[i]) * np.exp(SPIRAL_B * l) \
+                        * np.cos(2 * np.pi * l) + best_position
+                positions[i] = np.clip(positions[i], low, high)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    hidden, log_c = best_key
+    return {
+        'hidden_neurons': hidden,
+        'C': 10 ** log_c,
+        'score': scores[best_key],
+        'proposals': search_agents * iterations,
+        'evaluations': len(scores),
+        'hidden_sizes': len({hidden for hidden, _ in scores}),
+        'history': history,
+    }
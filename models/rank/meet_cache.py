@@ -0,0 +1,125 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Columns read from the OpenPowerlifting CSV and the dtypes they are parsed with.
+# Name and Date stay text only for the chunk being parsed.
+CSV_DTYPES = {
+    'Name': str,
+    'Sex': 'category',
+    'Event': 'category',
+    'Equipment': 'category',
+    'Age': np.float32,
+    'BodyweightKg': np.float32,
+    'Best3SquatKg': np.float32,
+    'Best3BenchKg': np.float32,
+    'Best3DeadliftKg': np.float32,
+    'Date': str,
+}
+# What the cache holds per meet, sorted by lifter and date: LifterId numbers the
+# lifters 0..n-1, Sex is 1 for M and 0 for F, Equipment 0 for Raw and 1 for any
+# supportive gear
+MEET_DTYPES = {
+    'LifterId': np.int32,
+    'Sex': np.int8,
+    'Equipment': np.int8,
+    'Age': np.float32,
+    'BodyweightKg': np.float32,
+    'Best3SquatKg': np.float32,
+    'Best3BenchKg': np.float32,
+    'Best3DeadliftKg': np.float32,
+    'Date': 'datetime64[D]',
+}
+SEX_CODES = {'M': 1, 'F': 0}
+EQUIPMENT_CODES = {'Raw': 0, 'Wraps': 1, 'Multi-ply': 1, 'Single-ply': 1, 'Unlimited': 1, 'Straps': 1}
+MIN_YEAR = 1996
+
+CSV_CHUNK_ROWS = 500_000
+# Bump when the filters or the layout change, so old caches get rebuilt
+CACHE_VERSION = 1
+
+
+# Filters one parsed chunk down to full-power SBD meets with all three lifts and
+# encodes it; the result has MEET_DTYPES columns, with the lifter's name hashed to
+# a 64-bit LifterKey in place of LifterId
+def clean_chunk(chunk):
+    chunk = chunk.dropna(axis=0, how='any')
+    date = pd.to_datetime(chunk['Date'], format='%Y-%m-%d', errors='coerce')
+    sex = chunk['Sex'].map(SEX_CODES).astype(np.float32)
+    equipment = chunk['Equipment'].map(EQUIPMENT_CODES).astype(np.float32)
+    keep = ((chunk['Event'] == 'SBD') & sex.notna() & equipment.notna() & (chunk['Best3SquatKg'] > 0)
+            & (chunk['Best3BenchKg'] > 0) & (chunk['Best3DeadliftKg'] > 0) & (date.dt.year >= MIN_YEAR)).to_numpy()
+
+    cleaned = {
+        'LifterKey': pd.util.hash_array(chunk['Name'].to_numpy()[keep]),
+        'Sex': sex.to_numpy()[keep].astype(np.int8),
+        'Equipment': equipment.to_numpy()[keep].astype(np.int8),
+        'Date': date.to_numpy()[keep].astype('datetime64[D]'),
+    }
+    for name in ('Age', 'BodyweightKg', 'Best3SquatKg', 'Best3BenchKg', 'Best3DeadliftKg'):
+        cleaned[name] = chunk[name].to_numpy()[keep]
+    return cleaned
+
+
+def _source_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {'path': os.path.abspath(csv_path), 'size': stat.st_size, 'mtime': stat.st_mtime,
+            'version': CACHE_VERSION}
+
+
+# Streams csv_path through clean_chunk chunk_rows rows at a time, so only the kept
+# meets, already in compact dtypes, are ever held in full. They are then sorted by
+# lifter and date and written to cache_dir, one .npy per MEET_DTYPES column, with
+# meta.json. Lifters are told apart by a 64-bit hash of their name, which for a few
+# million names all but never collides.
+def ingest_meets(csv_path, cache_dir, chunk_rows=CSV_CHUNK_ROWS):
+    chunks = []
+    rows = 0
+    with pd.read_csv(csv_path, usecols=list(CSV_DTYPES), dtype=CSV_DTYPES, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            rows += len(chunk)
+            chunks.append(clean_chunk(chunk))
+    if not chunks:
+        raise ValueError(f'{csv_path} has no rows')
+    meets = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+    del chunks
+
+    lifter_key = meets.pop('LifterKey')
+    order = np.lexsort((meets['Date'], lifter_key))
+    lifter_key = lifter_key[order]
+    meets['LifterId'] = np.concatenate([[0], np.cumsum(lifter_key[1:] != lifter_key[:-1])]).astype(np.int32)
+
+    tmp_dir = cache_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name in MEET_DTYPES:
+        values = meets[name] if name == 'LifterId' else meets[name][order]
+        np.save(os.path.join(tmp_dir, f'{name}.npy'), values.astype(MEET_DTYPES[name], copy=False))
+    meta = {'source': _source_signature(csv_path), 'rows': rows, 'meets': len(order),
+            'lifters': int(meets['LifterId'][-1]) + 1 if len(order) else 0}
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+    return meta
+
+
+def read_meets_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, 'meta.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# The cleaned meets of csv_path as read-only memory maps keyed by column, plus the
+# cache's meta. The cache is rebuilt first if csv_path changed since it was written.
+def load_meets(csv_path, cache_dir, chunk_rows=CSV_CHUNK_ROWS):
+    meta = read_meets_meta(cache_dir)
+    if meta is None or meta['source'] != _source_signature(csv_path):
+        meta = ingest_meets(csv_path, cache_dir, chunk_rows)
+    meets = {name: np.load(os.path.join(cache_dir, f'{name}.npy'), mmap_mode='r') for name in MEET_DTYPES}
+    return meets, meta
@@ -0,0 +1,146 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Columns of a training pair and how they're stored: flags as int8, the gap in days
+# as int32 and everything else as float32, one .npy file per column
+PAIR_COLUMNS = {
+    'Sex': np.int8,
+    'CurrentEquipment': np.int8,
+    'CurrentAge': np.float32,
+    'CurrentBodyweightKg': np.float32,
+    'CurrentBest3SquatKg': np.float32,
+    'CurrentBest3BenchKg': np.float32,
+    'CurrentBest3DeadliftKg': np.float32,
+    'DiffDays': np.int32,
+    'FutureEquipment': np.int8,
+    'FutureAge': np.float32,
+    'FutureBodyweightKg': np.float32,
+    'FutureBest3SquatKg': np.float32,
+    'FutureBest3BenchKg': np.float32,
+    'FutureBest3DeadliftKg': np.float32,
+}
+MEET_COLUMNS = ('Equipment', 'Age', 'BodyweightKg', 'Best3SquatKg', 'Best3BenchKg', 'Best3DeadliftKg')
+
+# Pairs materialized at once; bounds memory to a few hundred MB however large the dump
+CHUNK_PAIRS = 4_000_000
+
+
+# Number of later meets each meet pairs with, for meets sorted by lifter and date:
+# all of the lifter's later meets, or only those within max_gap_days. lifter holds
+# non-decreasing integer lifter ids and days the meet dates as day numbers.
+def pairs_per_meet(lifter, days, max_gap_days=None):
+    n = len(lifter)
+    if max_gap_days is None:
+        upper = np.searchsorted(lifter, lifter, side='right')
+    else:
+        # One sorted key for (lifter, day), spaced so no gap reaches the next lifter
+        days = days - days.min()
+        key = lifter.astype(np.int64) * (int(days.max()) + max_gap_days + 1) + days
+        upper = np.searchsorted(key, key + max_gap_days, side='right')
+    return upper - np.arange(n) - 1
+
+
+# Index pairs (i, j), i < j, for meets first..last-1, j running over the next
+# counts[i] meets, in the order the nested loop would produce them
+def expand_ranges(first, counts):
+    i = np.repeat(np.arange(first, first + len(counts)), counts)
+    offsets = np.cumsum(counts) - counts
+    j = i + 1 + np.arange(len(i)) - np.repeat(offsets, counts)
+    return i, j
+
+
+# Keeps at most cap pairs per lifter, chosen uniformly at random, in their original order
+def cap_pairs(pair_lifter, cap, rng):
+    order = np.lexsort((rng.random(len(pair_lifter)), pair_lifter))
+    sorted_lifter = pair_lifter[order]
+    group_start = np.searchsorted(sorted_lifter, sorted_lifter, side='left')
+    return np.sort(order[np.arange(len(order)) - group_start < cap])
+
+
+# Expands meets into every (earlier meet, later meet) pair of the same lifter and
+# writes them to out_dir as one .npy file per PAIR_COLUMNS column, plus meta.json.
+# meets (a DataFrame, or a dict of arrays such as meet_cache.load_meets returns)
+# needs lifter_column, Date (datetime), Sex and MEET_COLUMNS and must be sorted by
+# lifter and date, which puts the pairs in the order the per-lifter nested loop did.
+# source is recorded in meta.json to tell which meets the pairs came from.
+#
+# max_gap_days drops pairs further apart than that; max_pairs_per_lifter keeps a
+# random subset (seeded) of each lifter's pairs. The pair count is known up front,
+# so the columns are preallocated with open_memmap and filled in chunks of about
+# chunk_pairs pairs, split between lifters.
+def expand_pairs(meets, out_dir, max_pairs_per_lifter=None, max_gap_days=None, chunk_pairs=CHUNK_PAIRS, seed=0,
+                 lifter_column='Name', source=None):
+    lifter = pd.factorize(np.asarray(meets[lifter_column]))[0]
+    if len(lifter) and np.any(np.diff(lifter) < 0):
+        raise ValueError(f'meets must be sorted by {lifter_column} and Date')
+    days = np.asarray(meets['Date']).astype('datetime64[D]').astype(np.int64)
+    columns = {name: np.asarray(meets[name]) for name in ('Sex',) + MEET_COLUMNS}
+
+    per_meet = pairs_per_meet(lifter, days, max_gap_days)
+    per_lifter = np.bincount(lifter, weights=per_meet).astype(np.int64) if len(lifter) else np.zeros(0, np.int64)
+    kept = per_lifter if max_pairs_per_lifter is None else np.minimum(per_lifter, max_pairs_per_lifter)
+    total = int(kept.sum())
+
+    # Chunk boundaries fall between lifters, so a lifter's pairs are capped together
+    lifter_start = np.searchsorted(lifter, np.arange(len(per_lifter) + 1))
+    cumulative = np.cumsum(kept)
+    bounds = np.unique(np.searchsorted(cumulative, np.arange(chunk_pairs, total, chunk_pairs), side='left') + 1)
+    bounds = [0, *bounds[bounds < len(per_lifter)].tolist(), len(per_lifter)]
+
+    tmp_dir = out_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    outputs = {name: np.lib.format.open_memmap(os.path.join(tmp_dir, f'{name}.npy'), mode='w+', dtype=dtype,
+                                               shape=(total,))
+               for name, dtype in PAIR_COLUMNS.items()}
+
+    rng = np.random.default_rng(seed)
+    position = 0
+    for first_lifter, last_lifter in zip(bounds[:-1], bounds[1:]):
+        first, last = lifter_start[first_lifter], lifter_start[last_lifter]
+        i, j = expand_ranges(first, per_meet[first:last])
+        over_cap = per_lifter[first_lifter:last_lifter] > (max_pairs_per_lifter or np.inf)
+        if over_cap.any():
+            # Only the pairs of lifters over the cap go through the random selection
+            pair_lifter = lifter[i]
+            capped = np.flatnonzero(over_cap[pair_lifter - first_lifter])
+            keep = np.ones(len(i), dtype=bool)
+            keep[capped] = False
+            keep[capped[cap_pairs(pair_lifter[capped], max_pairs_per_lifter, rng)]] = True
+            i, j = i[keep], j[keep]
+
+        end = position + len(i)
+        outputs['Sex'][position:end] = columns['Sex'][i]
+        outputs['DiffDays'][position:end] = days[j] - days[i]
+        for name in MEET_COLUMNS:
+            outputs[f'Current{name}'][position:end] = columns[name][i]
+            outputs[f'Future{name}'][position:end] = columns[name][j]
+        position = end
+
+    for output in outputs.values():
+        output.flush()
+    del outputs
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump({'pairs': total, 'meets': len(lifter), 'lifters': len(per_lifter), 'source': source,
+                   'settings': {'max_pairs_per_lifter': max_pairs_per_lifter, 'max_gap_days': max_gap_days,
+                                'seed': seed}}, f)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return total
+
+
+def read_pairs_meta(out_dir):
+    try:
+        with open(os.path.join(out_dir, 'meta.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# The pair columns as read-only memory maps, keyed by column name
+def load_pairs(out_dir, mmap_mode='r'):
+    return {name: np.load(os.path.join(out_dir, f'{name}.npy'), mmap_mode=mmap_mode) for name in PAIR_COLUMNS}
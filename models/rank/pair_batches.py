@@ -0,0 +1,128 @@
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+FEATURE_COLUMNS = ['Sex', 'CurrentEquipment', 'CurrentAge', 'CurrentBodyweightKg',
+                   'CurrentBest3SquatKg', 'CurrentBest3BenchKg', 'CurrentBest3DeadliftKg',
+                   'DiffDays', 'FutureEquipment', 'FutureAge', 'FutureBodyweightKg']
+TARGET_COLUMNS = ['FutureBest3SquatKg', 'FutureBest3BenchKg', 'FutureBest3DeadliftKg']
+
+# Rows are split by a hash of their index into 25 buckets: 5 for test (20%), 4 for
+# validation (20% of the rest) and 16 for training, the proportions of the old
+# train_test_split(test_size=0.2) + validation_split=0.2, with nothing to store
+TEST, VALIDATION, TRAIN = 'test', 'validation', 'train'
+SPLIT_BUCKETS = {TEST: (0, 5), VALIDATION: (5, 9), TRAIN: (9, 25)}
+N_BUCKETS = 25
+
+# Rows read from the memory-mapped columns at once, and how many such blocks are
+# mixed together when shuffling; memory stays around BLOCK_ROWS * SHUFFLE_BLOCKS
+# rows whatever the dataset size
+BLOCK_ROWS = 1 << 16
+SHUFFLE_BLOCKS = 8
+
+
+# splitmix64 finalizer: a well-mixed 64-bit hash of each row index
+def _mix(indices):
+    z = indices.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def split_mask(start, end, split, seed=0):
+    low, high = SPLIT_BUCKETS[split]
+    bucket = _mix(np.arange(start, end, dtype=np.uint64) + np.uint64(seed) * np.uint64(1 << 40)) \
+        % np.uint64(N_BUCKETS)
+    return (bucket >= low) & (bucket < high)
+
+
+def n_rows(pairs):
+    return len(pairs[FEATURE_COLUMNS[0]])
+
+
+def read_block(pairs, start, end, columns):
+    return np.column_stack([np.asarray(pairs[name][start:end], dtype=np.float32) for name in columns])
+
+
+def count_split(pairs, split, seed=0, block_rows=BLOCK_ROWS):
+    return sum(int(split_mask(start, min(start + block_rows, n_rows(pairs)), split, seed).sum())
+               for start in range(0, n_rows(pairs), block_rows))
+
+
+# StandardScaler fit over every row one block at a time with partial_fit, which
+# keeps running means and variances; the result matches fit() on the whole array
+def fit_scaler(pairs, block_rows=BLOCK_ROWS):
+    scaler = StandardScaler()
+    for start in range(0, n_rows(pairs), block_rows):
+        scaler.partial_fit(read_block(pairs, start, min(start + block_rows, n_rows(pairs)), FEATURE_COLUMNS))
+    return scaler
+
+
+# (X, y) float32 batches of one split, with X scaled. With shuffle, blocks are
+# visited in a random order and SHUFFLE_BLOCKS of them at a time are shuffled
+# together, so consecutive pairs of one lifter get spread across batches; every row
+# of the split still comes out exactly once. Only the last batch may be short.
+def iter_batches(pairs, scaler, split, batch_size=32, shuffle=True, seed=0, block_rows=BLOCK_ROWS,
+                 shuffle_blocks=SHUFFLE_BLOCKS, split_seed=0):
+    rng = np.random.default_rng(seed)
+    starts = np.arange(0, n_rows(pairs), block_rows)
+    if shuffle:
+        rng.shuffle(starts)
+    mean = scaler.mean_.astype(np.float32)
+    scale = scaler.scale_.astype(np.float32)
+    group = shuffle_blocks if shuffle else 1
+
+    carry_X = np.zeros((0, len(FEATURE_COLUMNS)), dtype=np.float32)
+    carry_y = np.zeros((0, len(TARGET_COLUMNS)), dtype=np.float32)
+    for first in range(0, len(starts), group):
+        X_parts, y_parts = [carry_X], [carry_y]
+        for start in starts[first:first + group].tolist():
+            end = min(start + block_rows, n_rows(pairs))
+            keep = split_mask(start, end, split, split_seed)
+            X_parts.append(read_block(pairs, start, end, FEATURE_COLUMNS)[keep])
+            y_parts.append(read_block(pairs, start, end, TARGET_COLUMNS)[keep])
+        X = (np.concatenate(X_parts) - mean) / scale
+        y = np.concatenate(y_parts)
+        if shuffle:
+            order = rng.permutation(len(X))
+            X, y = X[order], y[order]
+
+        full = len(X) // batch_size * batch_size
+        for i in range(0, full, batch_size):
+            yield X[i:i + batch_size], y[i:i + batch_size]
+        carry_X, carry_y = X[full:], y[full:]
+    if len(carry_X):
+        yield carry_X, carry_y
+
+
+# Regression metrics accumulated batch by batch: MAE, MSE, RMSE and R^2 over all
+# three targets, and the share of predictions within 20% of the true lift
+class StreamingMetrics:
+    def __init__(self, n_targets=len(TARGET_COLUMNS)):
+        self.n = 0
+        self.abs_error = 0.0
+        self.sq_error = 0.0
+        self.y_sum = np.zeros(n_targets)
+        self.y_sq_sum = np.zeros(n_targets)
+        self.correct = 0
+
+    def update(self, y_true, y_pred):
+        y_true = np.asarray(y_true, dtype=np.float64)
+        y_pred = np.asarray(y_pred, dtype=np.float64)
+        self.n += len(y_true)
+        self.abs_error += np.abs(y_true - y_pred).sum()
+        self.sq_error += ((y_true - y_pred) ** 2).sum()
+        self.y_sum += y_true.sum(axis=0)
+        self.y_sq_sum += (y_true ** 2).sum(axis=0)
+        self.correct += int(np.isclose(y_pred, y_true, rtol=0.2).sum())
+
+    def result(self):
+        values = self.n * len(self.y_sum)
+        ss_total = (self.y_sq_sum - self.y_sum ** 2 / self.n).sum()
+        mse = self.sq_error / values
+        return {
+            'mae': self.abs_error / values,
+            'mse': mse,
+            'rmse': np.sqrt(mse),
+            'r2': 1 - self.sq_error / ss_total,
+            'accuracy': self.correct / values * 100,
+        }
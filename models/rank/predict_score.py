@@ -1,17 +1,16 @@
 import os
-os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
+import sys
 
-import pickle
-from tensorflow import keras
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
 
-scaler = pickle.load(open("score_scaler.pkl", "rb"))
+from score_mlp import load_score_mlp
 
-model = keras.models.load_model('score_model.h5')
+# NumPy forward pass of score_model.h5 with score_scaler.pkl folded in; the .npz is
+# exported next to them on first use, and again whenever the model is retrained
+model = load_score_mlp(os.path.abspath("score_model.npz"))
 
 input_data = [
     [1, 0, 27.0, 80.0, 120.0, 80.0, 180.0, 365, 0, 27.0, 80.0]
 ]
 
-input_scaled = scaler.transform(input_data)
-
-print(model.predict(input_scaled))
\ No newline at end of file
+print(model.predict(input_data))
\ No newline at end of file
@@ -1,5 +1,5 @@
+import itertools
 import os
-import numpy as np
 import pickle
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -7,55 +7,30 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 import tensorflow as tf
 from tensorflow import keras
-
-if not os.path.exists("op_data_clean.csv"):
-    df = pd.read_csv("op_data.csv", usecols=['Name', 'Sex', 'Event', 'Equipment', 'Age', 'BodyweightKg',
-                                            'Best3SquatKg', 'Best3BenchKg', 'Best3DeadliftKg', 'Date'])
-
-    df.dropna(axis=0, how='any', inplace=True)
-
-    df['Date'] = pd.to_datetime(df['Date'])
-
-    df = df[df['Sex'].isin(['M', 'F']) & (df['Event'] == 'SBD')
-            & (df['Best3SquatKg'] > 0) & (df['Best3BenchKg'] > 0) & (df['Best3DeadliftKg'] > 0)
-            & (df['Date'].dt.year >= 1996)]
-
-    df['Sex'] = df['Sex'].replace({'M': 1, 'F': 0})
-    df['Equipment'] = df['Equipment'].replace({'Wraps': 1, 'Multi-ply': 1, 'Single-ply': 1,
-                                            'Unlimited': 1, 'Straps': 1, 'Raw': 0})
-    
-    df = df.sort_values(by=['Name', 'Date']).reset_index(drop=True)
-    
-    result = []
-
-    for name, group in df.groupby('Name'):
-        records = group.to_dict('records')
-
-        for i in range(len(records)):
-            for j in range(i + 1, len(records)):
-                current = records[i]
-                future = records[j]
-                diff_days = (future['Date'] - current['Date']).days
-                result.append({
-                    'Sex': current['Sex'],
-                    'CurrentEquipment': current['Equipment'],
-                    'CurrentAge': current['Age'],
-                    'CurrentBodyweightKg': current['BodyweightKg'],
-                    'CurrentBest3SquatKg': current['Best3SquatKg'],
-                    'CurrentBest3BenchKg': current['Best3BenchKg'],
-                    'CurrentBest3DeadliftKg': current['Best3DeadliftKg'],
-                    'DiffDays': diff_days,
-                    'FutureEquipment': future['Equipment'],
-                    'FutureAge': future['Age'],
-                    'FutureBodyweightKg': future['BodyweightKg'],
-                    'FutureBest3SquatKg': future['Best3SquatKg'],
-                    'FutureBest3BenchKg': future['Best3BenchKg'],
-                    'FutureBest3DeadliftKg': future['Best3DeadliftKg'],
-                })
-
-    df = pd.DataFrame(result)
-
-    df.to_csv("op_data_clean.csv", index=False)
+from meet_cache import load_meets
+from meet_pairs import expand_pairs, load_pairs, read_pairs_meta
+from pair_batches import (FEATURE_COLUMNS, TARGET_COLUMNS, TEST, TRAIN, VALIDATION, StreamingMetrics, fit_scaler,
+                          iter_batches)
+
+# Training pairs, as memory-mappable columns. Capping the pairs per lifter or the
+# days between the two meets bounds the dataset size (0 = no cap)
+PAIRS_DIR = "op_pairs"
+MAX_PAIRS_PER_LIFTER = int(os.getenv("MAX_PAIRS_PER_LIFTER", 0)) or None
+MAX_GAP_DAYS = int(os.getenv("MAX_GAP_DAYS", 0)) or None
+
+# Cleaned meets from the OpenPowerlifting dump, parsed once in typed chunks and
+# cached as memory-mappable columns (see meet_cache.py)
+MEETS_DIR = "op_meets"
+meets, meets_meta = load_meets("op_data.csv", MEETS_DIR)
+
+pairs_settings = {'max_pairs_per_lifter': MAX_PAIRS_PER_LIFTER, 'max_gap_days': MAX_GAP_DAYS, 'seed': 0}
+pairs_meta = read_pairs_meta(PAIRS_DIR)
+if pairs_meta is None or pairs_meta['settings'] != pairs_settings or pairs_meta.get('source') != meets_meta['source']:
+    # Every (earlier meet, later meet) pair per lifter, expanded with array ops and
+    # written column by column in chunks (see meet_pairs.py)
+    n_pairs = expand_pairs(meets, PAIRS_DIR, max_pairs_per_lifter=MAX_PAIRS_PER_LIFTER, max_gap_days=MAX_GAP_DAYS,
+                           lifter_column='LifterId', source=meets_meta['source'])
+    print(f"Wrote {n_pairs} training pairs from {meets_meta['meets']} meets to {PAIRS_DIR}")
 
 # gpus = tf.config.list_physical_devices('GPU')
 
@@ -66,71 +41,80 @@ if not os.path.exists("op_data_clean.csv"):
 # else:
 #     print("No GPUs available.")
 
-df = pd.read_csv("op_data_clean.csv")
+pairs = load_pairs(PAIRS_DIR)
 
 # plt.title('BodyweightKg vs. Best3SquatKg')
 # plt.scatter(df['BodyweightKg'][:100000], df['Best3SquatKg'][:100000], s=1)
 # plt.show()
 
-X = df[['Sex', 'CurrentEquipment', 'CurrentAge', 'CurrentBodyweightKg',
-        'CurrentBest3SquatKg', 'CurrentBest3BenchKg', 'CurrentBest3DeadliftKg',
-        'DiffDays', 'FutureEquipment', 'FutureAge', 'FutureBodyweightKg']]
-y = df[['FutureBest3SquatKg', 'FutureBest3BenchKg', 'FutureBest3DeadliftKg']]
-
-# Normalize the feature data
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
+# Streaming training (the default) never holds the pairs in memory: the scaler is
+# fit block by block and Keras reads shuffled batches straight from the
+# memory-mapped pair columns through tf.data (see pair_batches.py), so peak memory
+# doesn't grow with the dataset. SCORE_STREAMING=0 loads everything as before.
+SCORE_STREAMING = os.getenv("SCORE_STREAMING", "1") == "1"
+BATCH_SIZE = 32
+EPOCHS = 10
+EVAL_BATCH_SIZE = 8192
+
+def batch_dataset(split, shuffle):
+    epochs = itertools.count()
+    signature = (tf.TensorSpec((None, len(FEATURE_COLUMNS)), tf.float32),
+                 tf.TensorSpec((None, len(TARGET_COLUMNS)), tf.float32))
+    # The generator is restarted every epoch, with a new shuffle each time
+    dataset = tf.data.Dataset.from_generator(
+        lambda: iter_batches(pairs, scaler, split, BATCH_SIZE, shuffle=shuffle, seed=next(epochs)),
+        output_signature=signature)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+if SCORE_STREAMING:
+    scaler = fit_scaler(pairs)
+else:
+    df = pd.DataFrame(pairs)
+    X = df[FEATURE_COLUMNS]
+    y = df[TARGET_COLUMNS]
+
+    # Normalize the feature data
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+
+    X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42)
 
 if not os.path.exists("score_scaler.pkl"):
     with open("score_scaler.pkl", "wb") as f:
         pickle.dump(scaler, f)
 
-X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42)
-
 if not os.path.exists("score_model.h5"):
     model = keras.Sequential([
-        keras.layers.Dense(64, activation='relu', input_shape=(X_train.shape[1],)),  # Input layer
+        keras.layers.Dense(64, activation='relu', input_shape=(len(FEATURE_COLUMNS),)),  # Input layer
         keras.layers.Dense(32, activation='relu'),  # Hidden layer
         keras.layers.Dense(3)  # Output layer for squat, bench, deadlift
     ])
 
     model.compile(optimizer='adam', loss='mean_squared_error')
 
-    history = model.fit(X_train, y_train, epochs=10, batch_size=32, validation_split=0.2)
+    if SCORE_STREAMING:
+        history = model.fit(batch_dataset(TRAIN, shuffle=True), epochs=EPOCHS,
+                            validation_data=batch_dataset(VALIDATION, shuffle=False))
+    else:
+        history = model.fit(X_train, y_train, epochs=EPOCHS, batch_size=BATCH_SIZE, validation_split=0.2)
 
     model.save('score_model.h5')
 
 model = keras.models.load_model('score_model.h5')
 
-# Evaluate the model
-y_pred = model.predict(X_test)
-
-# Mean Absolute Error (MAE)
-mae = np.mean(np.abs(y_test - y_pred))
-
-# Mean Squared Error (MSE)
-mse = np.mean((y_test - y_pred)**2)
-
-# Root Mean Squared Error (RMSE)
-rmse = np.sqrt(mse)
-
-# R^2 Score
-ss_total = ((y_test - y_test.mean())**2).sum().sum()  # Sum of squares total
-ss_residual = ((y_test - y_pred)**2).sum().sum()      # Sum of squares residual
-r2 = 1 - (ss_residual / ss_total)
+# Evaluate the model: MAE, MSE, RMSE, R^2 and the share of predictions within 20%,
+# accumulated a batch at a time
+metrics = StreamingMetrics()
+if SCORE_STREAMING:
+    for X_batch, y_batch in iter_batches(pairs, scaler, TEST, EVAL_BATCH_SIZE, shuffle=False):
+        metrics.update(y_batch, model.predict_on_batch(X_batch))
+else:
+    metrics.update(y_test, model.predict(X_test))
+scores = metrics.result()
 
 # Print metrics
-print(f"MAE: {mae:.4f}")
-print(f"MSE: {mse:.4f}")
-print(f"RMSE: {rmse:.4f}")
-print(f"R^2: {r2:.4f}")
-
-# Accuracy
-correct = 0
-for i in range(len(y_pred)):
-    for j in range(3):
-        if np.isclose(y_pred[i][j], y_test.iloc[i, j], rtol=0.2):
-            correct += 1
-
-accuracy = correct / (len(y_test) * 3) * 100
-print(f"Accuracy: {accuracy:.2f}%")
\ No newline at end of file
+print(f"MAE: {scores['mae']:.4f}")
+print(f"MSE: {scores['mse']:.4f}")
+print(f"RMSE: {scores['rmse']:.4f}")
+print(f"R^2: {scores['r2']:.4f}")
+print(f"Accuracy: {scores['accuracy']:.2f}%")